@@ -2,28 +2,91 @@
 
 from __future__ import annotations
 
+import functools
 import logging
 import os
 import signal
 import subprocess
 import sys
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
-from pythonjsonlogger.json import JsonFormatter
+try:
+    from pythonjsonlogger.orjson import OrjsonFormatter as _BaseJsonFormatter
+except ImportError:  # orjson is an optional speedup (the `fast` extra)
+    from pythonjsonlogger.json import JsonFormatter as _BaseJsonFormatter
 
 from vault_backup import __version__
 from vault_backup.backup import BackupResult, run_backup
 from vault_backup.config import Config
 from vault_backup.health import HealthServer
 from vault_backup.notify import Notifier
+from vault_backup.restore import check_restic_repository, invalidate_restic_cache
 from vault_backup.ui import RestoreHandler
 from vault_backup.watcher import VaultWatcher
 
 
+class _PreSerializedFieldsMixin:
+    """Serialize ``static_fields`` once, at construction, for a JSON formatter base.
+
+    The static fields are kept out of the per-record dict and their encoded
+    form is spliced into each serialized record instead, using the same item
+    separator the base formatter writes.
+    """
+
+    def __init__(
+        self, *args: Any, static_fields: dict[str, Any] | None = None, **kwargs: Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        # '{"service": ..., "version": ...}' -> '"service": ..., "version": ...'
+        self._static_json = self.jsonify_log_record(static_fields or {})[1:-1]
+        # ", " for the stdlib json base, "," for orjson
+        probe = self.jsonify_log_record({"a": 0, "b": 0})
+        self._separator = probe[probe.index("0") + 1 : probe.rindex('"b"')]
+
+    def serialize_log_record(self, log_data: dict[str, Any]) -> str:
+        payload = self.jsonify_log_record(log_data)
+        if not self._static_json:
+            return self.prefix + payload
+        if payload == "{}":
+            return f"{self.prefix}{{{self._static_json}}}"
+        return f"{self.prefix}{{{self._static_json}{self._separator}{payload[1:]}"
+
+
+class _PreSerializedJsonFormatter(_PreSerializedFieldsMixin, _BaseJsonFormatter):
+    """Production JSON log formatter: orjson-backed with the `fast` extra."""
+
+
+class _FastStdoutHandler(logging.StreamHandler):
+    """Stream handler that writes each record to the stdout fd with one os.write().
+
+    Skips the TextIOWrapper encode/buffer/flush path. Records below PIPE_BUF
+    are written atomically, so lines from different threads never interleave.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(sys.stdout)
+        self._fd = sys.stdout.fileno()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            data = (self.format(record) + self.terminator).encode()
+            while data:
+                data = data[os.write(self._fd, data) :]
+        except Exception:
+            self.handleError(record)
+
+
 def _configure_logging() -> None:
     """Configure structured JSON logging to stdout."""
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = JsonFormatter(
+    handler: logging.Handler
+    try:
+        handler = _FastStdoutHandler()
+    except (AttributeError, OSError, ValueError):
+        # stdout replaced by something without a real fd (e.g. captured)
+        handler = logging.StreamHandler(sys.stdout)
+    formatter = _PreSerializedJsonFormatter(
         fmt="%(asctime)s %(levelname)s %(name)s %(message)s",
         rename_fields={
             "asctime": "timestamp",
@@ -64,65 +127,141 @@ Thumbs.db
 # Backup test files
 .backup-write-test
 """
+_GITIGNORE_BYTES = GITIGNORE_CONTENT.encode()
+
+# State files and their initial contents, encoded once for os.write()
+_DEFAULT_STATE = {
+    "last_commit": b"0",
+    "last_backup": b"0",
+    "last_change": b"0",
+    "last_watcher_event": b"0",
+    "last_push": b"0",
+    "pending_changes": b"false",
+}
+
+
+_REQUIRED_ENV = (
+    "RESTIC_REPOSITORY",
+    "RESTIC_PASSWORD",
+)
 
 
-def validate_environment() -> None:
+@functools.lru_cache(maxsize=1)
+def _validated_env() -> tuple[dict[str, str], tuple[str, ...]]:
+    """Read required environment variables in a single pass.
+
+    Returns the captured values and the names that were missing or empty.
+    Cached so repeated validation does not re-read the environment.
+    """
+    values: dict[str, str] = {}
+    missing: list[str] = []
+    for var in _REQUIRED_ENV:
+        value = os.environ.get(var)
+        if value:
+            values[var] = value
+        else:
+            missing.append(var)
+    return values, tuple(missing)
+
+
+def validate_environment() -> str:
     """Validate required environment variables.
 
     Only RESTIC_REPOSITORY and RESTIC_PASSWORD are universally required.
     Backend-specific vars (Azure, S3, B2, etc.) are validated by restic itself.
-    """
-    required = [
-        "RESTIC_REPOSITORY",
-        "RESTIC_PASSWORD",
-    ]
 
-    missing = [var for var in required if not os.environ.get(var)]
+    Returns the repository with everything after the backend scheme masked,
+    safe to include in log lines.
+    """
+    values, missing = _validated_env()
     if missing:
-        log.error("Missing required environment variables", extra={"missing": missing})
+        log.error("Missing required environment variables", extra={"missing": list(missing)})
         sys.exit(1)
 
-    repo = os.environ["RESTIC_REPOSITORY"]
-    log.info("Environment validated", extra={"restic_repository": repo.split(":")[0] + ":***"})
+    sanitized_repo = values["RESTIC_REPOSITORY"].split(":", 1)[0] + ":***"
+    log.info("Environment validated", extra={"restic_repository": sanitized_repo})
+    return sanitized_repo
+
+
+@dataclass(frozen=True)
+class VaultLayout:
+    """What startup needs to know about the vault and state directory."""
+
+    has_git: bool
+    has_gitignore: bool
+    existing_state_files: frozenset[str]
+    writable: bool
 
 
-def initialize_state_dir(state_dir: Path) -> None:
-    """Create state directory and initialize state files."""
+def _scan_vault_state(
+    vault_path: Path, state_dir: Path, *, strict_write_probe: bool = False
+) -> VaultLayout:
+    """List the state directory and the vault once each.
+
+    Creates the state directory if needed. Exits if the vault is missing,
+    not a directory, or cannot be listed. Writability is checked with access(2), which also
+    reports read-only mounts. With *strict_write_probe*, a test file is
+    created and removed as well.
+    """
     state_dir.mkdir(parents=True, exist_ok=True)
-    log.info("State directory initialized", extra={"state_dir": str(state_dir)})
+    with os.scandir(state_dir) as entries:
+        existing_state_files = frozenset(entry.name for entry in entries)
 
-    # Initialize state files with defaults
-    defaults = {
-        "last_commit": "0",
-        "last_backup": "0",
-        "last_change": "0",
-        "last_watcher_event": "0",
-        "last_push": "0",
-        "pending_changes": "false",
-    }
-
-    for name, value in defaults.items():
-        state_file = state_dir / name
-        if not state_file.exists():
-            state_file.write_text(value)
-
-
-def validate_vault(vault_path: Path) -> None:
-    """Validate vault directory exists and is writable."""
-    if not vault_path.exists():
+    try:
+        with os.scandir(vault_path) as entries:
+            vault_names = {entry.name for entry in entries}
+    except FileNotFoundError:
         log.error("Vault directory does not exist", extra={"vault_path": str(vault_path)})
         sys.exit(1)
-
-    if not vault_path.is_dir():
+    except NotADirectoryError:
         log.error("Vault path is not a directory", extra={"vault_path": str(vault_path)})
         sys.exit(1)
-
-    # Check writable
-    test_file = vault_path / ".backup-write-test"
-    try:
-        test_file.touch()
-        test_file.unlink()
     except PermissionError:
+        log.error(
+            "Vault directory is not readable. Check the mount's ownership and permissions",
+            extra={"vault_path": str(vault_path)},
+        )
+        sys.exit(1)
+
+    writable = os.access(vault_path, os.W_OK | os.X_OK)
+    if writable and strict_write_probe:
+        test_file = vault_path / ".backup-write-test"
+        try:
+            test_file.touch()
+            test_file.unlink()
+        except PermissionError:
+            writable = False
+
+    return VaultLayout(
+        has_git=".git" in vault_names,
+        has_gitignore=".gitignore" in vault_names,
+        existing_state_files=existing_state_files,
+        writable=writable,
+    )
+
+
+def initialize_state_dir(state_dir: Path, layout: VaultLayout) -> None:
+    """Initialize state files the scan did not find."""
+    log.info("State directory initialized", extra={"state_dir": str(state_dir)})
+
+    # Initialize state files with defaults
+    # O_EXCL guards against a file appearing between the scan and the create.
+    for name, value in _DEFAULT_STATE.items():
+        if name in layout.existing_state_files:
+            continue
+        try:
+            fd = os.open(state_dir / name, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            continue
+        try:
+            os.write(fd, value)
+        finally:
+            os.close(fd)
+
+
+def validate_vault(vault_path: Path, layout: VaultLayout) -> None:
+    """Exit unless the scanned vault is writable."""
+    if not layout.writable:
         log.error(
             "Vault directory is not writable. Remove ':ro' from the volume mount",
             extra={"vault_path": str(vault_path)},
@@ -131,47 +270,111 @@ def validate_vault(vault_path: Path) -> None:
     log.info("Vault validated", extra={"vault_path": str(vault_path)})
 
 
-def initialize_git(config: Config) -> None:
+# Startup git commands only need these from the environment; passing a pruned
+# copy keeps the child's envp small.
+_MINIMAL_GIT_ENV = {
+    key: value
+    for key, value in os.environ.items()
+    if key in ("PATH", "HOME", "XDG_CONFIG_HOME") or key.startswith("GIT_")
+}
+
+
+def _run_git_silent(
+    args: list[str], *, cwd: Path | None = None, check: bool = True, capture: bool = False
+) -> subprocess.CompletedProcess[bytes]:
+    """Run a startup git command with a pruned environment and no stdin.
+
+    stdout is discarded unless *capture* is set, and is never decoded here.
+    stderr is kept as bytes and logged if the command fails with *check* set.
+    """
+    try:
+        return subprocess.run(
+            args,
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            env=_MINIMAL_GIT_ENV,
+            check=check,
+        )
+    except subprocess.CalledProcessError as e:
+        log.error(
+            "Git command failed",
+            extra={
+                "command": " ".join(args),
+                "returncode": e.returncode,
+                "stderr": e.stderr.decode(errors="replace").strip(),
+            },
+        )
+        raise
+
+
+# Managed settings live in an include file next to .git/config so they can be
+# written in one go instead of one `git config` process per key.
+_GIT_CONFIG_INCLUDE = "vault-backup.gitconfig"
+
+
+def _git_config_value(value: str) -> str:
+    """Quote a value for a git config file."""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _write_git_config(vault_path: Path, config: Config) -> None:
+    """Write identity and line-ending settings to the repo in a single file write.
+
+    The include directive is appended to .git/config only if it is not
+    already there, leaving any other ``include.path`` entries alone.
+    """
+    git_dir = vault_path / ".git"
+    (git_dir / _GIT_CONFIG_INCLUDE).write_text(
+        "[user]\n"
+        f"\tname = {_git_config_value(config.git_user_name)}\n"
+        f"\temail = {_git_config_value(config.git_user_email)}\n"
+        "[core]\n"
+        "\tautocrlf = input\n"
+        "\tsafecrlf = false\n"
+    )
+
+    # Exits 1 when no include.path is set yet
+    included = _run_git_silent(
+        ["git", "config", "--local", "--get-all", "include.path"],
+        cwd=vault_path,
+        check=False,
+        capture=True,
+    )
+    if _GIT_CONFIG_INCLUDE not in included.stdout.decode(errors="replace").splitlines():
+        _run_git_silent(
+            ["git", "config", "--local", "--add", "include.path", _GIT_CONFIG_INCLUDE],
+            cwd=vault_path,
+        )
+
+
+def initialize_git(config: Config, layout: VaultLayout) -> None:
     """Initialize git repository in vault if needed."""
     vault_path = Path(config.vault_path)
 
     # Mark directory as safe (required for Git 2.35.2+)
     # Uses --system to avoid polluting user's global git config (biz)
     # Falls back to --global if --system fails (no permissions outside container)
-    sys_result = subprocess.run(
+    sys_result = _run_git_silent(
         ["git", "config", "--system", "--add", "safe.directory", str(vault_path)],
-        capture_output=True,
+        check=False,
     )
     if sys_result.returncode != 0:
-        subprocess.run(
-            ["git", "config", "--global", "--add", "safe.directory", str(vault_path)],
-            check=True,
-        )
+        _run_git_silent(["git", "config", "--global", "--add", "safe.directory", str(vault_path)])
 
-    git_dir = vault_path / ".git"
-    if not git_dir.exists():
+    if not layout.has_git:
         log.info("Initializing git repository in vault")
-        subprocess.run(["git", "init"], cwd=vault_path, check=True)
+        _run_git_silent(["git", "init"], cwd=vault_path)
 
         # Create .gitignore if it doesn't exist
-        gitignore = vault_path / ".gitignore"
-        if not gitignore.exists():
+        if not layout.has_gitignore:
             log.info("Creating .gitignore")
-            gitignore.write_text(GITIGNORE_CONTENT)
+            (vault_path / ".gitignore").write_bytes(_GITIGNORE_BYTES)
 
     # Configure git
-    subprocess.run(
-        ["git", "config", "user.name", config.git_user_name],
-        cwd=vault_path,
-        check=True,
-    )
-    subprocess.run(
-        ["git", "config", "user.email", config.git_user_email],
-        cwd=vault_path,
-        check=True,
-    )
-    subprocess.run(["git", "config", "core.autocrlf", "input"], cwd=vault_path, check=True)
-    subprocess.run(["git", "config", "core.safecrlf", "false"], cwd=vault_path, check=True)
+    _write_git_config(vault_path, config)
 
     # Configure remote if specified
     if config.git_remote_url:
@@ -180,15 +383,13 @@ def initialize_git(config: Config) -> None:
             cwd=vault_path, capture_output=True, text=True,
         )
         if _result.returncode != 0:
-            subprocess.run(
-                ["git", "remote", "add", "origin", config.git_remote_url],
-                cwd=vault_path, check=True,
+            _run_git_silent(
+                ["git", "remote", "add", "origin", config.git_remote_url], cwd=vault_path
             )
             log.info("Git remote added", extra={"remote_url": config.git_remote_url})
         elif _result.stdout.strip() != config.git_remote_url:
-            subprocess.run(
-                ["git", "remote", "set-url", "origin", config.git_remote_url],
-                cwd=vault_path, check=True,
+            _run_git_silent(
+                ["git", "remote", "set-url", "origin", config.git_remote_url], cwd=vault_path
             )
             log.info("Git remote updated", extra={"remote_url": config.git_remote_url})
         else:
@@ -204,12 +405,7 @@ def initialize_git(config: Config) -> None:
 
 def check_restic(config: Config) -> None:
     """Check if restic repository is initialized."""
-    result = subprocess.run(
-        ["restic", "snapshots", "--quiet"],
-        capture_output=True,
-        text=True,
-    )
-    if result.returncode != 0:
+    if not check_restic_repository():
         log.warning(
             "Restic repository not found. Run 'restic init' to initialize. "
             "Continuing without backup functionality"
@@ -231,20 +427,54 @@ def main() -> None:
         sys.exit(1)
 
 
+class _LazySentryHandler(logging.Handler):
+    """Initialize Sentry when the first ERROR record is logged.
+
+    Importing and initializing sentry_sdk costs noticeable startup time, so a
+    run that never logs an error never pays it. After initialization, Sentry's
+    own logging integration captures later records and this handler stands down.
+    """
+
+    def __init__(self, config: Config) -> None:
+        super().__init__(level=logging.ERROR)
+        self._config = config
+        self._initialized = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Handler.handle() holds self.lock, so only one thread initializes
+        if self._initialized:
+            return
+        self._initialized = True
+        try:
+            import sentry_sdk
+
+            sentry_sdk.init(
+                dsn=self._config.sentry_dsn,
+                release=f"vault-backup@{__version__}",
+                environment=self._config.sentry_environment,
+                traces_sample_rate=0,
+            )
+            # This record predates the logging integration, so send it directly
+            if record.exc_info:
+                sentry_sdk.capture_exception(record.exc_info)
+            else:
+                sentry_sdk.capture_message(record.getMessage(), level="error")
+        except Exception:
+            self.handleError(record)
+            return
+        log.info("Sentry initialized", extra={"environment": self._config.sentry_environment})
+
+
 def _init_sentry(config: Config) -> None:
-    """Initialize Sentry error tracking if DSN is configured."""
+    """Arrange for Sentry error tracking if DSN is configured.
+
+    sentry_sdk is imported and initialized lazily, on the first error.
+    """
     if not config.sentry_dsn:
         return
 
-    import sentry_sdk
-
-    sentry_sdk.init(
-        dsn=config.sentry_dsn,
-        release=f"vault-backup@{__version__}",
-        environment=config.sentry_environment,
-        traces_sample_rate=0,
-    )
-    log.info("Sentry initialized", extra={"environment": config.sentry_environment})
+    logging.getLogger().addHandler(_LazySentryHandler(config))
+    log.info("Sentry armed", extra={"environment": config.sentry_environment})
 
 
 def _format_file_list(files: list[str], limit: int = 5) -> str:
@@ -305,12 +535,12 @@ def _run() -> None:
     log.info("Starting Obsidian Vault Backup sidecar")
 
     # Validate environment
-    validate_environment()
+    sanitized_repo = validate_environment()
 
     # Load configuration
     config = Config.from_env()
 
-    # Initialize Sentry early so it captures all subsequent errors
+    # Arm Sentry early so it captures all subsequent errors
     _init_sentry(config)
 
     log.info(
@@ -324,6 +554,7 @@ def _run() -> None:
             "ai_commits": config.llm.enabled,
             "notifications": config.notify.enabled,
             "sentry": bool(config.sentry_dsn),
+            "restic_repository": sanitized_repo,
         },
     )
 
@@ -334,9 +565,12 @@ def _run() -> None:
     state_dir = Path(config.state_dir)
     vault_path = Path(config.vault_path)
 
-    initialize_state_dir(state_dir)
-    validate_vault(vault_path)
-    initialize_git(config)
+    layout = _scan_vault_state(
+        vault_path, state_dir, strict_write_probe=config.strict_write_probe
+    )
+    initialize_state_dir(state_dir, layout)
+    validate_vault(vault_path, layout)
+    initialize_git(config, layout)
     check_restic(config)
 
     # Create notifier
@@ -353,6 +587,8 @@ def _run() -> None:
         """Called by watcher when changes are detected and debounce period elapses."""
         try:
             result = run_backup(config, state_dir)
+            if result.backup_created:
+                invalidate_restic_cache()
 
             if result.success and result.backup_created:
                 notifier.success(
@@ -9,11 +9,13 @@ import urllib.request
 from dataclasses import dataclass
 from datetime import UTC, datetime
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, BinaryIO
 
 from vault_backup import __version__
 
 if TYPE_CHECKING:
+    import threading
+
     from vault_backup.config import Config
 
 log = logging.getLogger(__name__)
@@ -39,10 +41,65 @@ def run_cmd(
     cmd: list[str], *, cwd: Path | None = None, check: bool = True
 ) -> subprocess.CompletedProcess[str]:
     """Run a command and return result."""
-    log.debug("Running command", extra={"command": " ".join(cmd)})
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Running command", extra={"command": " ".join(cmd)})
     return subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, check=check)
 
 
+# How often a cancellable command checks its cancel event
+_CANCEL_POLL_SECONDS = 0.1
+
+
+def run_cmd_to_file(
+    cmd: list[str],
+    target: Path,
+    *,
+    cwd: Path | None = None,
+    cancel: threading.Event | None = None,
+) -> subprocess.CompletedProcess[bytes]:
+    """Run a command with its stdout written straight to *target*.
+
+    Output is streamed into a temporary file next to *target*, which replaces
+    *target* only if the command succeeds. A failed command never truncates an
+    existing file. Setting *cancel* terminates the command, which then counts
+    as failed.
+    """
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Running command", extra={"command": " ".join(cmd), "target": str(target)})
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.restore-tmp")
+    try:
+        with tmp.open("wb") as out:
+            if cancel is None:
+                result = subprocess.run(
+                    cmd, cwd=cwd, stdout=out, stderr=subprocess.PIPE, check=False
+                )
+            else:
+                result = _run_cancellable(cmd, cwd, out, cancel)
+        if result.returncode == 0:
+            tmp.replace(target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return result
+
+
+def _run_cancellable(
+    cmd: list[str], cwd: Path | None, out: BinaryIO, cancel: threading.Event
+) -> subprocess.CompletedProcess[bytes]:
+    """Run *cmd* with stdout to *out*, terminating it once *cancel* is set."""
+    with subprocess.Popen(cmd, cwd=cwd, stdout=out, stderr=subprocess.PIPE) as proc:
+        while True:
+            try:
+                _, stderr = proc.communicate(timeout=_CANCEL_POLL_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel.is_set():
+                    proc.terminate()
+                    _, stderr = proc.communicate()
+                    break
+    return subprocess.CompletedProcess(cmd, proc.returncode, None, stderr)
+
+
 def has_changes(vault_path: Path) -> bool:
     """Check if there are uncommitted changes in the vault."""
     result = run_cmd(["git", "status", "--porcelain"], cwd=vault_path, check=False)
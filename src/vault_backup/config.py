@@ -184,6 +184,9 @@ class Config:
 
     # Feature flags
     dry_run: bool = False
+    # Also probe vault writability by creating a file, for mounts where
+    # access(2) reports writable but writes still fail
+    strict_write_probe: bool = False
 
     # Observability
     sentry_dsn: str | None = None
@@ -212,6 +215,7 @@ class Config:
                 if p.strip()
             ),
             dry_run=os.environ.get("DRY_RUN", "").lower() in ("true", "1", "yes"),
+            strict_write_probe=_bool_env("VAULT_STRICT_WRITE_PROBE", False),
             sentry_dsn=os.environ.get("SENTRY_DSN"),
             sentry_environment=os.environ.get("SENTRY_ENVIRONMENT", "production"),
             retention=RetentionPolicy.from_env(),
@@ -259,6 +259,13 @@ class HealthHandler(BaseHTTPRequestHandler):
         self.wfile.write(body)
 
 
+def _set_health_state(state: HealthState | None) -> None:
+    """Install (or clear, with None) the state the HTTP handlers report on."""
+    global _health_state
+    with _health_state_lock:
+        _health_state = state
+
+
 class HealthServer:
     """Health HTTP server running in a background thread."""
 
@@ -274,9 +281,7 @@ class HealthServer:
 
     def start(self) -> None:
         """Start the health server in a background thread."""
-        global _health_state
-        with _health_state_lock:
-            _health_state = HealthState(config=self.config)
+        _set_health_state(HealthState(config=self.config))
 
         self.server = HTTPServer(("0.0.0.0", self.config.health_port), self.handler_class)
         self.thread = threading.Thread(target=self._serve, daemon=True)
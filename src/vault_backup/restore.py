@@ -4,18 +4,57 @@ from __future__ import annotations
 
 import json
 import logging
-from dataclasses import dataclass
+import re
+import subprocess
+import sys
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Self
 
-from vault_backup.backup import run_cmd
+from vault_backup.backup import run_cmd, run_cmd_to_file
+
+if TYPE_CHECKING:
+    import threading
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # orjson is an optional speedup (the `fast` extra)
+    from json import loads as _json_loads
 
 log = logging.getLogger(__name__)
 
 
+# --- Display formatting ---
+
+
+def format_display_time(iso_time: str) -> str:
+    """Format an ISO timestamp as ``YYYY-MM-DD HH:MM`` for display."""
+    # git and restic timestamps already start with "YYYY-MM-DDTHH:MM"; slice
+    # them instead of building a datetime
+    if (
+        len(iso_time) >= 16
+        and iso_time[4] == "-"
+        and iso_time[10] in ("T", " ")
+        and iso_time[13] == ":"
+    ):
+        return iso_time[:10] + " " + iso_time[11:16]
+    try:
+        dt = datetime.fromisoformat(iso_time.replace("Z", "+00:00"))
+        return dt.strftime("%Y-%m-%d %H:%M")
+    except (ValueError, AttributeError):
+        return iso_time
+
+
 # --- Data classes ---
 
+# The display_* properties format on first use and keep the result, so cached
+# listings that are rendered repeatedly only format each timestamp once.
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class GitCommit:
     """A git commit entry."""
 
@@ -23,20 +62,38 @@ class GitCommit:
     short_hash: str
     date: str
     message: str
+    _display_date: str | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def display_date(self) -> str:
+        value = self._display_date
+        if value is None:
+            value = format_display_time(self.date)
+            object.__setattr__(self, "_display_date", value)
+        return value
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ResticSnapshot:
     """A restic snapshot entry."""
 
     id: str
     short_id: str
     time: str
-    paths: list[str]
-    tags: list[str]
+    paths: tuple[str, ...]
+    tags: tuple[str, ...]
+    _display_time: str | None = field(default=None, init=False, repr=False, compare=False)
 
+    @property
+    def display_time(self) -> str:
+        value = self._display_time
+        if value is None:
+            value = format_display_time(self.time)
+            object.__setattr__(self, "_display_time", value)
+        return value
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class ResticEntry:
     """A file entry from restic ls."""
 
@@ -44,9 +101,18 @@ class ResticEntry:
     type: str
     size: int
     mtime: str
+    _display_time: str | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def display_time(self) -> str:
+        value = self._display_time
+        if value is None:
+            value = format_display_time(self.mtime)
+            object.__setattr__(self, "_display_time", value)
+        return value
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GitFileChange:
     """A file changed in a git commit."""
 
@@ -56,31 +122,36 @@ class GitFileChange:
 
 # --- Git operations ---
 
-_GIT_LOG_FORMAT = "%H%n%h%n%aI%n%s"
+# Fields are NUL-separated; with `git log -z` each record is NUL-terminated too
+_GIT_LOG_FORMAT = "%H%x00%h%x00%aI%x00%s"
+
+# Only the formatted fields: no diff, notes, ref decorations or colour codes
+_GIT_LOG_CMD = [
+    "git", "log", "-z", "-s", "--no-notes", "--no-decorate", "--no-color",
+    f"--format={_GIT_LOG_FORMAT}",
+]
 
 
 def _parse_git_log(output: str) -> list[GitCommit]:
-    """Parse git log output using 4-line-per-commit format."""
-    lines = output.strip().split("\n")
-    commits: list[GitCommit] = []
-    # Each commit is 4 consecutive lines: hash, short_hash, date, message
-    for i in range(0, len(lines) - 3, 4):
-        commits.append(
-            GitCommit(
-                hash=lines[i],
-                short_hash=lines[i + 1],
-                date=lines[i + 2],
-                message=lines[i + 3],
-            )
-        )
-    return commits
+    """Parse ``git log -z`` output with four NUL-separated fields per commit."""
+    fields = output.split("\0")
+    return [GitCommit(*fields[i : i + 4]) for i in range(0, len(fields) - 3, 4)]
+
+
+def git_head(vault_path: Path) -> str | None:
+    """Return the commit hash HEAD points at, or None outside a repo or before the first commit."""
+    result = run_cmd(["git", "rev-parse", "--verify", "-q", "HEAD"], cwd=vault_path, check=False)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
 
 
 def git_log(vault_path: Path, count: int = 20) -> list[GitCommit]:
     """List recent git commits in the vault."""
-    log.debug("Listing git commits", extra={"vault_path": str(vault_path), "count": count})
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Listing git commits", extra={"vault_path": str(vault_path), "count": count})
     result = run_cmd(
-        ["git", "log", f"--format={_GIT_LOG_FORMAT}", f"-{count}"],
+        [*_GIT_LOG_CMD, f"-{count}"],
         cwd=vault_path,
         check=False,
     )
@@ -91,9 +162,10 @@ def git_log(vault_path: Path, count: int = 20) -> list[GitCommit]:
 
 def git_log_single(vault_path: Path, commit: str) -> list[GitCommit]:
     """Get a single commit's details by hash."""
-    log.debug("Getting commit details", extra={"commit": commit})
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Getting commit details", extra={"commit": commit})
     result = run_cmd(
-        ["git", "log", f"--format={_GIT_LOG_FORMAT}", "-1", commit],
+        [*_GIT_LOG_CMD, "-1", commit],
         cwd=vault_path,
         check=False,
     )
@@ -104,12 +176,13 @@ def git_log_single(vault_path: Path, commit: str) -> list[GitCommit]:
 
 def git_file_history(vault_path: Path, filepath: str, count: int = 10) -> list[GitCommit]:
     """List commits that modified a specific file."""
-    log.debug(
-        "Listing file history",
-        extra={"vault_path": str(vault_path), "filepath": filepath, "count": count},
-    )
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            "Listing file history",
+            extra={"vault_path": str(vault_path), "filepath": filepath, "count": count},
+        )
     result = run_cmd(
-        ["git", "log", "--follow", f"--format={_GIT_LOG_FORMAT}", f"-{count}", "--", filepath],
+        [*_GIT_LOG_CMD, "--follow", f"-{count}", "--", filepath],
         cwd=vault_path,
         check=False,
     )
@@ -118,12 +191,106 @@ def git_file_history(vault_path: Path, filepath: str, count: int = 10) -> list[G
     return _parse_git_log(result.stdout)
 
 
-def git_show_file(vault_path: Path, commit: str, filepath: str) -> str:
-    """Retrieve file content at a specific commit."""
-    log.debug(
-        "Showing file at commit",
-        extra={"commit": commit, "filepath": filepath},
-    )
+class GitCatFile:
+    """Long-lived ``git cat-file --batch`` process for repeated blob lookups.
+
+    Use as a context manager. Each :meth:`read` is one request/response on
+    the pipe instead of a fresh ``git show`` process.
+    """
+
+    def __init__(self, vault_path: Path) -> None:
+        self._vault_path = vault_path
+        self._proc: subprocess.Popen[bytes] | None = None
+
+    def __enter__(self) -> Self:
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=self._vault_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def read(self, commit: str, filepath: str) -> bytes | None:
+        """Return the blob at ``commit:filepath``, or None if it does not exist.
+
+        Raises OSError if the batch process has gone away.
+        """
+        proc = self._proc
+        if proc is None or proc.stdin is None or proc.stdout is None:
+            msg = "git cat-file process is not running"
+            raise OSError(msg)
+
+        proc.stdin.write(f"{commit}:{filepath}\n".encode())
+        proc.stdin.flush()
+        header = proc.stdout.readline()
+        if not header:
+            msg = "git cat-file process exited"
+            raise OSError(msg)
+
+        # "<object> missing" / "<object> ambiguous" otherwise; the object name
+        # echoes the path, which may itself contain spaces
+        header = header.rstrip(b"\n")
+        if header.endswith((b" missing", b" ambiguous")):
+            return None
+        # "<sha> <type> <size>" on hit
+        parts = header.rsplit(b" ", 2)
+        if len(parts) != 3 or not parts[2].isdigit():
+            self.close()
+            msg = f"unexpected git cat-file header: {header!r}"
+            raise OSError(msg)
+        data = proc.stdout.read(int(parts[2]))
+        proc.stdout.read(1)  # trailing newline
+        return data if parts[1] == b"blob" else None
+
+    def close(self) -> None:
+        proc = self._proc
+        if proc is None:
+            return
+        self._proc = None
+        if proc.stdin is not None:
+            proc.stdin.close()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        if proc.stdout is not None:
+            proc.stdout.close()
+
+
+def git_show_file(
+    vault_path: Path, commit: str, filepath: str, *, batch: GitCatFile | None = None
+) -> str:
+    """Retrieve file content at a specific commit.
+
+    Pass an open :class:`GitCatFile` as *batch* to reuse its process across
+    calls; falls back to ``git show`` if the batch process has died.
+    """
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            "Showing file at commit",
+            extra={"commit": commit, "filepath": filepath},
+        )
+    if batch is not None and batch.alive:
+        try:
+            data = batch.read(commit, filepath)
+        except OSError:
+            log.warning("git cat-file batch process died, falling back to git show")
+        else:
+            if data is None:
+                msg = f"File '{filepath}' not found at commit {commit}"
+                raise FileNotFoundError(msg)
+            return data.decode()
+
     result = run_cmd(
         ["git", "show", f"{commit}:{filepath}"],
         cwd=vault_path,
@@ -135,22 +302,60 @@ def git_show_file(vault_path: Path, commit: str, filepath: str) -> str:
     return result.stdout
 
 
-def git_restore_file(vault_path: Path, commit: str, filepath: str, target: Path) -> Path:
-    """Restore a file from a git commit to a target path."""
+def git_restore_file(
+    vault_path: Path,
+    commit: str,
+    filepath: str,
+    target: Path,
+    *,
+    batch: GitCatFile | None = None,
+) -> Path:
+    """Restore a file from a git commit to a target path.
+
+    Pass an open :class:`GitCatFile` as *batch* to read the blob through it
+    instead of a new ``git show`` process.
+    """
     log.info(
         "Restoring file from git",
         extra={"commit": commit, "filepath": filepath, "target": str(target)},
     )
-    content = git_show_file(vault_path, commit, filepath)
-    target.parent.mkdir(parents=True, exist_ok=True)
-    target.write_text(content)
+    data: bytes | None = None
+    if batch is not None and batch.alive:
+        try:
+            data = batch.read(commit, filepath)
+        except OSError:
+            log.warning("git cat-file batch process died, falling back to git show")
+        else:
+            if data is None:
+                msg = f"File '{filepath}' not found at commit {commit}"
+                raise FileNotFoundError(msg)
+
+    if data is not None:
+        _replace_file(target, data)
+    else:
+        result = run_cmd_to_file(["git", "show", f"{commit}:{filepath}"], target, cwd=vault_path)
+        if result.returncode != 0:
+            msg = f"File '{filepath}' not found at commit {commit}"
+            raise FileNotFoundError(msg)
     log.info("File restored from git", extra={"target": str(target)})
     return target
 
 
+def _replace_file(target: Path, data: bytes) -> None:
+    """Write *data* to *target* via a temporary file, like ``run_cmd_to_file``."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.restore-tmp")
+    try:
+        tmp.write_bytes(data)
+        tmp.replace(target)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
 def git_diff_tree(vault_path: Path, commit: str) -> list[GitFileChange]:
     """List files changed in a specific git commit."""
-    log.debug("Listing files in commit", extra={"commit": commit})
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Listing files in commit", extra={"commit": commit})
     result = run_cmd(
         ["git", "diff-tree", "--no-commit-id", "-r", "--name-status", commit],
         cwd=vault_path,
@@ -175,10 +380,11 @@ def git_diff_file(vault_path: Path, commit: str, filepath: str) -> str:
     Uses ``git diff commit^..commit -- filepath``. Falls back to
     ``git diff-tree -p --root`` for root commits (no parent).
     """
-    log.debug(
-        "Getting file diff at commit",
-        extra={"commit": commit, "filepath": filepath},
-    )
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            "Getting file diff at commit",
+            extra={"commit": commit, "filepath": filepath},
+        )
     result = run_cmd(
         ["git", "diff", f"{commit}^..{commit}", "--", filepath],
         cwd=vault_path,
@@ -197,72 +403,171 @@ def git_diff_file(vault_path: Path, commit: str, filepath: str) -> str:
 # --- Restic operations ---
 
 
-def restic_snapshots(tag: str = "obsidian") -> list[ResticSnapshot]:
-    """List restic snapshots."""
-    log.debug("Listing restic snapshots", extra={"tag": tag})
+# Snapshot listings are reused for a short window so the startup repository
+# check and the first UI load share one `restic snapshots` call.
+_SNAPSHOT_CACHE_TTL = 30.0
+_snapshot_cache: tuple[float, str, list[ResticSnapshot]] | None = None
+
+
+def invalidate_restic_cache() -> None:
+    """Drop the cached snapshot listing (call after a new backup)."""
+    global _snapshot_cache
+    _snapshot_cache = None
+
+
+def _cached_snapshots(tag: str) -> list[ResticSnapshot] | None:
+    """Return a fresh cached listing for *tag*, filtering a full listing if needed."""
+    cache = _snapshot_cache
+    if cache is None:
+        return None
+    fetched_at, cached_tag, snaps = cache
+    if time.monotonic() - fetched_at >= _SNAPSHOT_CACHE_TTL:
+        return None
+    if cached_tag == tag:
+        return list(snaps)
+    if not cached_tag:
+        # Same semantics as `--tag a,b`: the snapshot must carry every tag
+        required = set(tag.split(","))
+        return [s for s in snaps if required.issubset(s.tags)]
+    return None
+
+
+# Snapshots share a handful of tag and path sets, so each distinct set is kept
+# as one tuple of interned strings instead of fresh lists per snapshot
+_interned_tuples: dict[tuple[str, ...], tuple[str, ...]] = {}
+
+
+def _intern_tuple(values: list[str]) -> tuple[str, ...]:
+    key = tuple(map(sys.intern, values))
+    return _interned_tuples.setdefault(key, key)
+
+
+def snapshot_from_json(obj: dict[str, Any]) -> ResticSnapshot:
+    """Build a :class:`ResticSnapshot` from one ``restic snapshots --json`` object."""
+    return ResticSnapshot(
+        id=obj["id"],
+        short_id=obj.get("short_id", obj["id"][:8]),
+        time=obj["time"],
+        paths=_intern_tuple(obj.get("paths") or []),
+        tags=_intern_tuple(obj.get("tags") or []),
+    )
+
+
+def _fetch_snapshots(tag: str) -> list[ResticSnapshot] | None:
+    """Run ``restic snapshots`` and cache the result. Returns None if restic failed."""
+    global _snapshot_cache
     cmd = ["restic", "snapshots", "--json"]
     if tag:
         cmd.extend(["--tag", tag])
 
-    result = run_cmd(cmd, check=False)
-    if result.returncode != 0 or not result.stdout.strip():
+    # Raw bytes: both orjson and json parse them without a separate decode step
+    result = subprocess.run(cmd, capture_output=True, check=False)
+    if result.returncode != 0:
+        return None
+    if not result.stdout.strip():
         return []
 
     try:
-        entries = json.loads(result.stdout)
+        entries = _json_loads(result.stdout)
     except json.JSONDecodeError:
         log.warning("Failed to parse restic snapshots JSON")
         return []
 
-    return [
-        ResticSnapshot(
-            id=s["id"],
-            short_id=s.get("short_id", s["id"][:8]),
-            time=s["time"],
-            paths=s.get("paths", []),
-            tags=s.get("tags", []),
-        )
-        for s in entries
-    ]
+    snaps = [snapshot_from_json(s) for s in entries]
+    _snapshot_cache = (time.monotonic(), tag, snaps)
+    return list(snaps)
 
 
-def restic_ls(snapshot_id: str, path: str = "/") -> list[ResticEntry]:
-    """List files in a restic snapshot."""
-    log.debug("Listing snapshot files", extra={"snapshot_id": snapshot_id, "path": path})
-    result = run_cmd(
-        ["restic", "ls", "--json", snapshot_id],
-        check=False,
-    )
+def restic_snapshots(tag: str = "obsidian") -> list[ResticSnapshot]:
+    """List restic snapshots.
+
+    Served from a listing fetched within the last ``_SNAPSHOT_CACHE_TTL``
+    seconds when one is available.
+    """
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Listing restic snapshots", extra={"tag": tag})
+    cached = _cached_snapshots(tag)
+    if cached is not None:
+        return cached
+    return _fetch_snapshots(tag) or []
+
+
+def restic_latest_snapshot_ids(tag: str = "obsidian") -> set[str] | None:
+    """Return the IDs of the newest snapshot in each group, or None if restic failed.
+
+    Much smaller than a full listing, so it is a cheap way to tell whether a
+    saved listing is missing newer snapshots.
+    """
+    cmd = ["restic", "snapshots", "--json", "--latest", "1"]
+    if tag:
+        cmd.extend(["--tag", tag])
+    result = subprocess.run(cmd, capture_output=True, check=False)
     if result.returncode != 0:
-        msg = f"Snapshot '{snapshot_id}' not found"
-        raise ValueError(msg)
+        return None
+    if not result.stdout.strip():
+        return set()
+    try:
+        return {s["id"] for s in _json_loads(result.stdout)}
+    except (json.JSONDecodeError, KeyError, TypeError):
+        log.warning("Failed to parse restic snapshots JSON")
+        return None
 
-    entries: list[ResticEntry] = []
-    for line in result.stdout.strip().split("\n"):
-        if not line.strip():
-            continue
-        try:
-            obj = json.loads(line)
-        except json.JSONDecodeError:
-            continue
-        # restic ls --json emits one JSON object per line; skip the snapshot metadata line
-        if "struct_type" in obj and obj["struct_type"] == "snapshot":
-            continue
-        entries.append(
-            ResticEntry(
+
+def check_restic_repository() -> bool:
+    """Return whether the restic repository is reachable.
+
+    Lists all snapshots, which also primes the snapshot cache.
+    """
+    return _fetch_snapshots("") is not None
+
+
+def iter_restic_ls(snapshot_id: str, path: str = "/") -> Iterator[ResticEntry]:
+    """Yield files in a restic snapshot as restic lists them.
+
+    Lines are parsed straight from bytes, so they are not decoded before the
+    JSON parser sees them. A non-root *path* is passed to restic, which only
+    walks and emits that subtree. Raises ValueError once the output is
+    exhausted if restic failed.
+    """
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Listing snapshot files", extra={"snapshot_id": snapshot_id, "path": path})
+    normalized = path.rstrip("/") if path != "/" else ""
+    cmd = ["restic", "ls", "--json", snapshot_id]
+    if normalized:
+        # restic only walks this subtree; --recursive keeps nested entries
+        cmd.extend(["--recursive", normalized])
+
+    with subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    ) as proc:
+        assert proc.stdout is not None  # stdout=PIPE
+        for line in proc.stdout:
+            if not line.strip():
+                continue
+            try:
+                obj = _json_loads(line)
+            except json.JSONDecodeError:
+                continue
+            # restic ls --json emits one JSON object per line; skip the snapshot metadata line
+            if obj.get("struct_type") == "snapshot":
+                continue
+            yield ResticEntry(
                 path=obj.get("path", ""),
                 type=obj.get("type", "file"),
                 size=obj.get("size", 0),
                 mtime=obj.get("mtime", ""),
             )
-        )
 
-    # Filter by path prefix if not root
-    if path != "/":
-        normalized = path.rstrip("/")
-        entries = [e for e in entries if e.path.startswith(normalized)]
+    if proc.returncode != 0:
+        msg = f"Snapshot '{snapshot_id}' not found"
+        raise ValueError(msg)
 
-    return entries
+
+def restic_ls(snapshot_id: str, path: str = "/") -> list[ResticEntry]:
+    """List files in a restic snapshot. See :func:`iter_restic_ls`."""
+    return list(iter_restic_ls(snapshot_id, path))
 
 
 def group_entries_by_directory(
@@ -314,10 +619,11 @@ def group_entries_by_directory(
 
 def restic_show_file(snapshot_id: str, filepath: str) -> str:
     """Retrieve file content from a restic snapshot without writing to disk."""
-    log.debug(
-        "Showing file from restic",
-        extra={"snapshot_id": snapshot_id, "filepath": filepath},
-    )
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            "Showing file from restic",
+            extra={"snapshot_id": snapshot_id, "filepath": filepath},
+        )
     result = run_cmd(
         ["restic", "dump", snapshot_id, filepath],
         check=False,
@@ -328,26 +634,30 @@ def restic_show_file(snapshot_id: str, filepath: str) -> str:
     return result.stdout
 
 
-def restic_restore_file(snapshot_id: str, filepath: str, target: Path) -> Path:
-    """Restore a single file from a restic snapshot using dump."""
+def restic_restore_file(
+    snapshot_id: str, filepath: str, target: Path, *, cancel: threading.Event | None = None
+) -> Path:
+    """Restore a single file from a restic snapshot using dump.
+
+    Setting *cancel* stops the dump; the restore then fails as not found.
+    """
     log.info(
         "Restoring file from restic",
         extra={"snapshot_id": snapshot_id, "filepath": filepath, "target": str(target)},
     )
-    result = run_cmd(
-        ["restic", "dump", snapshot_id, filepath],
-        check=False,
-    )
+    result = run_cmd_to_file(["restic", "dump", snapshot_id, filepath], target, cancel=cancel)
     if result.returncode != 0:
         msg = f"Failed to restore '{filepath}' from snapshot {snapshot_id}"
         raise FileNotFoundError(msg)
 
-    target.parent.mkdir(parents=True, exist_ok=True)
-    target.write_text(result.stdout)
     log.info("File restored from restic", extra={"target": str(target)})
     return target
 
 
+# git accepts upper-case hex abbreviations as well
+_HEX_RE = re.compile(r"[0-9a-f]+", re.IGNORECASE)
+
+
 def detect_source(source: str) -> str:
     """Detect whether a source identifier is a git commit or restic snapshot.
 
@@ -358,10 +668,11 @@ def detect_source(source: str) -> str:
     # Git hashes are always hex. Use length as a heuristic:
     # - 40 chars = definitely full git hash
     # - 7-8 chars = could be either; caller should try git first
-    if len(source) == 40 and all(c in "0123456789abcdef" for c in source):
-        return "git"
-    if len(source) == 8 and all(c in "0123456789abcdef" for c in source):
+    if not _HEX_RE.fullmatch(source):
+        return "restic"
+    length = len(source)
+    if length == 8:
         return "ambiguous"
-    if all(c in "0123456789abcdef" for c in source) and 7 <= len(source) <= 40:
+    if 7 <= length <= 40:
         return "git"
     return "restic"
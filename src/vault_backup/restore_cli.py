@@ -3,23 +3,21 @@
 from __future__ import annotations
 
 import argparse
+import itertools
 import logging
 import os
 import sys
-from datetime import datetime
+from collections.abc import Callable, Iterable, Iterator
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, NoReturn
 
 from vault_backup import __version__
-from vault_backup.restore import (
-    detect_source,
-    git_file_history,
-    git_log,
-    git_restore_file,
-    git_show_file,
-    restic_ls,
-    restic_restore_file,
-    restic_snapshots,
-)
+
+# vault_backup.restore (and the urllib stack behind vault_backup.backup) is
+# imported inside each subcommand so --help and --version stay fast; the same
+# goes for the stdlib modules only the caches and restore need
+if TYPE_CHECKING:
+    from vault_backup.restore import GitCatFile, GitCommit, ResticEntry, ResticSnapshot
 
 log = logging.getLogger(__name__)
 
@@ -44,13 +42,148 @@ def _vault_path() -> Path:
     return path
 
 
-def _format_time(iso_time: str) -> str:
-    """Format an ISO timestamp into a shorter human-readable form."""
+# Table layouts, shared by each header and its rows. Bound str.format methods
+# avoid rebuilding an f-string per row.
+_SNAPSHOT_ROW = "{:<10} {:<18} {:<40} {}".format
+_FILE_ROW = "{:<6} {:>10} {:<18} {}".format
+_LOG_ROW = "{:<10} {:<18} {}".format
+
+# Rows are written in batches of this many lines rather than one print() each
+_ROW_BATCH = 1024
+
+
+def _write_rows(rows: Iterable[str]) -> None:
+    """Write table rows to stdout in batches.
+
+    Each batch is encoded once and written to the binary buffer under
+    ``sys.stdout``, bypassing the text layer. Rows gathered before *rows*
+    raises are still written.
+    """
+    stdout = sys.stdout
+    buffer = getattr(stdout, "buffer", None)
+    if buffer is not None:
+        stdout.flush()  # anything already printed must come first
+        encoding = stdout.encoding or "utf-8"
+        errors = stdout.errors or "strict"
+
+    def emit(batch: list[str]) -> None:
+        text = "\n".join(batch) + "\n"
+        if buffer is None:
+            stdout.write(text)
+        else:
+            buffer.write(text.encode(encoding, errors))
+            buffer.flush()
+
+    batch: list[str] = []
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= _ROW_BATCH:
+                emit(batch)
+                batch.clear()
+    finally:
+        if batch:
+            emit(batch)
+
+
+# --- On-disk caches ---
+
+
+def _cache_path(kind: str, *key_parts: object) -> Path:
+    """Return a cache file under $XDG_CACHE_HOME/vault-backup for the given key."""
+    import hashlib
+
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    key = hashlib.sha256("\0".join(map(str, key_parts)).encode()).hexdigest()[:16]
+    return Path(cache_home) / "vault-backup" / f"{kind}-{key}.json"
+
+
+def _write_cache(cache_path: Path, payload: object) -> None:
+    """Write *payload* as JSON to a cache file. Failures are not fatal."""
+    import json
+
+    tmp = cache_path.with_name(f".{cache_path.name}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(payload))
+        os.replace(tmp, cache_path)
+    except OSError as e:
+        log.debug("Could not write cache", extra={"path": str(cache_path), "error": str(e)})
+
+
+def _read_cache(cache_path: Path) -> Any:
+    """Return the parsed cache file, or None if it is missing or unreadable."""
+    import json
+
+    try:
+        from orjson import loads
+    except ImportError:  # orjson is an optional speedup (the `fast` extra)
+        loads = json.loads
+
+    try:
+        return loads(cache_path.read_bytes())
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _snapshots_cache_path(repo: str, tag: str) -> Path:
+    """Return the on-disk cache file for a repository and tag filter."""
+    return _cache_path("snapshots", repo, tag)
+
+
+def _load_cached_snapshots(cache_path: Path, tag: str) -> list[ResticSnapshot] | None:
+    """Return the saved listing if restic has no snapshot newer than it.
+
+    Snapshots removed by ``restic forget`` are not detected; use --no-cache
+    after pruning.
+    """
+    from vault_backup.restore import restic_latest_snapshot_ids, snapshot_from_json
+
+    cached = _read_cache(cache_path)
+    if cached is None:
+        return None
+    try:
+        snaps = [snapshot_from_json(s) for s in cached]
+    except (KeyError, TypeError):
+        log.debug("Ignoring unreadable snapshot cache", extra={"path": str(cache_path)})
+        return None
+
+    latest = restic_latest_snapshot_ids(tag)
+    if latest is None or not latest.issubset({s.id for s in snaps}):
+        return None
+    return snaps
+
+
+def _save_cached_snapshots(cache_path: Path, snaps: list[ResticSnapshot]) -> None:
+    """Write a snapshot listing to the cache."""
+    _write_cache(
+        cache_path,
+        [
+            {"id": s.id, "short_id": s.short_id, "time": s.time, "paths": s.paths, "tags": s.tags}
+            for s in snaps
+        ],
+    )
+
+
+def _load_cached_log(cache_path: Path, head: str) -> list[GitCommit] | None:
+    """Return the saved commit list if it was written at the same HEAD."""
+    from vault_backup.restore import GitCommit
+
+    cached = _read_cache(cache_path)
+    if not isinstance(cached, dict) or cached.get("head") != head:
+        return None
     try:
-        dt = datetime.fromisoformat(iso_time.replace("Z", "+00:00"))
-        return dt.strftime("%Y-%m-%d %H:%M")
-    except (ValueError, AttributeError):
-        return iso_time
+        return [GitCommit(*fields) for fields in cached["commits"]]
+    except (KeyError, TypeError):
+        return None
+
+
+def _save_cached_log(cache_path: Path, head: str, commits: list[GitCommit]) -> None:
+    """Write a commit list to the cache, tagged with the HEAD it was read at."""
+    _write_cache(
+        cache_path,
+        {"head": head, "commits": [[c.hash, c.short_hash, c.date, c.message] for c in commits]},
+    )
 
 
 # --- Subcommands ---
@@ -58,73 +191,195 @@ def _format_time(iso_time: str) -> str:
 
 def cmd_snapshots(args: argparse.Namespace) -> None:
     """List restic snapshots."""
-    tag = getattr(args, "tag", "obsidian")
-    snaps = restic_snapshots(tag=tag)
+    from vault_backup.restore import restic_snapshots
+
+    tag = args.tag
+    repo = os.environ.get("RESTIC_REPOSITORY")
+    cache_path = None
+    if repo and not args.no_cache:
+        cache_path = _snapshots_cache_path(repo, tag)
+
+    snaps = _load_cached_snapshots(cache_path, tag) if cache_path else None
+    if snaps is None:
+        snaps = restic_snapshots(tag=tag)
+        if snaps and cache_path:
+            _save_cached_snapshots(cache_path, snaps)
     if not snaps:
         print("No snapshots found.")
         return
 
-    # Table header
-    print(f"{'ID':<10} {'Time':<18} {'Paths':<40} {'Tags'}")
-    print("-" * 80)
+    _write_rows((_render_snapshots_table(snaps),))
+
+
+def _render_snapshots_table(snaps: Iterable[ResticSnapshot]) -> str:
+    """Render the snapshots table, without a trailing newline."""
+    rows = [_SNAPSHOT_ROW("ID", "Time", "Paths", "Tags"), "-" * 80]
     for s in snaps:
         paths = ", ".join(s.paths) if s.paths else "-"
         tags = ", ".join(s.tags) if s.tags else "-"
-        print(f"{s.short_id:<10} {_format_time(s.time):<18} {paths:<40} {tags}")
+        rows.append(_SNAPSHOT_ROW(s.short_id, s.display_time, paths, tags))
+    return "\n".join(rows)
+
+
+def _file_row(entry: ResticEntry) -> str:
+    """Format one row of the files table."""
+    size_str = f"{entry.size:,}" if entry.type == "file" else "-"
+    return _FILE_ROW(entry.type, size_str, entry.display_time, entry.path)
+
+
+def _files_table_rows(entries: Iterable[ResticEntry]) -> Iterator[str]:
+    """Yield the files table line by line, so long listings can stream."""
+    yield _FILE_ROW("Type", "Size", "Modified", "Path")
+    yield "-" * 80
+    yield from map(_file_row, entries)
 
 
 def cmd_files(args: argparse.Namespace) -> None:
-    """List files in a restic snapshot."""
+    """List files in a restic snapshot, writing rows as restic produces them."""
+    from vault_backup.restore import iter_restic_ls
+
     try:
-        entries = restic_ls(args.snapshot_id, path=getattr(args, "path", "/"))
+        entries = iter(iter_restic_ls(args.snapshot_id, path=args.path))
+        first = next(entries, None)
+        if first is None:
+            print("No files found.")
+            return
+
+        _write_rows(_files_table_rows(itertools.chain((first,), entries)))
     except ValueError as e:
         print(f"error: {e}", file=sys.stderr)
         sys.exit(1)
 
-    if not entries:
-        print("No files found.")
-        return
-
-    print(f"{'Type':<6} {'Size':>10} {'Modified':<18} {'Path'}")
-    print("-" * 80)
-    for e in entries:
-        size_str = f"{e.size:,}" if e.type == "file" else "-"
-        print(f"{e.type:<6} {size_str:>10} {_format_time(e.mtime):<18} {e.path}")
-
 
 def cmd_log(args: argparse.Namespace) -> None:
     """Show git commit history."""
-    vault = _vault_path()
-    filepath = getattr(args, "file", None)
+    from vault_backup.restore import git_file_history, git_head, git_log
 
-    if filepath:
-        commits = git_file_history(vault, filepath, count=getattr(args, "count", 20))
-    else:
-        commits = git_log(vault, count=getattr(args, "count", 20))
+    vault = _vault_path()
+    filepath = args.file
+
+    # History only changes when HEAD moves, so reuse the last listing until then
+    head = None if args.no_cache else git_head(vault)
+    cache_path = None
+    if head:
+        cache_path = _cache_path("log", vault.resolve(), filepath or "", args.count)
+
+    commits = _load_cached_log(cache_path, head) if cache_path and head else None
+    if commits is None:
+        if filepath:
+            commits = git_file_history(vault, filepath, count=args.count)
+        else:
+            commits = git_log(vault, count=args.count)
+        if commits and cache_path and head:
+            _save_cached_log(cache_path, head, commits)
 
     if not commits:
         print("No commits found.")
         return
 
-    print(f"{'Hash':<10} {'Date':<18} {'Message'}")
-    print("-" * 70)
-    for c in commits:
-        print(f"{c.short_hash:<10} {_format_time(c.date):<18} {c.message}")
+    _write_rows((_render_log_table(commits),))
+
+
+def _render_log_table(commits: Iterable[GitCommit]) -> str:
+    """Render the commit history table, without a trailing newline."""
+    rows = [_LOG_ROW("Hash", "Date", "Message"), "-" * 70]
+    rows.extend(_LOG_ROW(c.short_hash, c.display_date, c.message) for c in commits)
+    return "\n".join(rows)
 
 
-def cmd_show(args: argparse.Namespace) -> None:
-    """Show file content at a specific git commit."""
+def cmd_show(args: argparse.Namespace, *, git_batch: GitCatFile | None = None) -> None:
+    """Show file content at a specific git commit.
+
+    An interactive session can pass one open *git_batch* for all lookups.
+    """
+    from vault_backup.restore import git_show_file
+
     vault = _vault_path()
     try:
-        content = git_show_file(vault, args.commit, args.path)
+        content = git_show_file(vault, args.commit, args.path, batch=git_batch)
     except FileNotFoundError as e:
         print(f"error: {e}", file=sys.stderr)
         sys.exit(1)
     print(content, end="")
 
 
-def cmd_restore(args: argparse.Namespace) -> None:
-    """Restore a file from git or restic."""
+def _exit_not_found_anywhere(filepath: str, source: str) -> NoReturn:
+    print(
+        f"error: '{filepath}' not found in git commit or restic snapshot '{source}'",
+        file=sys.stderr,
+    )
+    sys.exit(1)
+
+
+def _restore_git_then_restic(
+    vault: Path, source: str, filepath: str, output: Path, git_batch: GitCatFile | None
+) -> None:
+    """Restore an ambiguous ID from git, falling back to restic.
+
+    The restic dump starts alongside the git lookup (into a scratch file) so
+    a git miss does not add a round trip; a git hit cancels it.
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from vault_backup.restore import git_restore_file, restic_restore_file
+
+    scratch = output.with_name(f".{output.name}.restic-probe")
+    cancel = threading.Event()
+    try:
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            restic_probe = pool.submit(
+                restic_restore_file, source, filepath, scratch, cancel=cancel
+            )
+            try:
+                try:
+                    git_restore_file(vault, source, filepath, output, batch=git_batch)
+                except FileNotFoundError:
+                    pass
+                else:
+                    print(f"Restored {filepath} from git commit {source} -> {output}")
+                    return
+
+                try:
+                    restic_probe.result()
+                except FileNotFoundError:
+                    _exit_not_found_anywhere(filepath, source)
+                os.replace(scratch, output)
+                print(f"Restored {filepath} from restic snapshot {source} -> {output}")
+            finally:
+                # Stop the dump on a git hit or any error before the pool
+                # waits on it; a no-op once restic has finished
+                cancel.set()
+    finally:
+        scratch.unlink(missing_ok=True)
+
+
+def _restore_restic_then_git(
+    vault: Path, source: str, filepath: str, output: Path, git_batch: GitCatFile | None
+) -> None:
+    """Restore an ambiguous ID from restic, falling back to git."""
+    from vault_backup.restore import git_restore_file, restic_restore_file
+
+    try:
+        restic_restore_file(source, filepath, output)
+        print(f"Restored {filepath} from restic snapshot {source} -> {output}")
+        return
+    except FileNotFoundError:
+        pass
+    try:
+        git_restore_file(vault, source, filepath, output, batch=git_batch)
+        print(f"Restored {filepath} from git commit {source} -> {output}")
+    except FileNotFoundError:
+        _exit_not_found_anywhere(filepath, source)
+
+
+def cmd_restore(args: argparse.Namespace, *, git_batch: GitCatFile | None = None) -> None:
+    """Restore a file from git or restic.
+
+    An interactive session can pass one open *git_batch* for all lookups.
+    """
+    from vault_backup.restore import detect_source, git_restore_file, restic_restore_file
+
     source = args.source
     filepath = args.path
     output = Path(args.output) if args.output else Path(filepath).name
@@ -133,30 +388,21 @@ def cmd_restore(args: argparse.Namespace) -> None:
     source_type = detect_source(source)
 
     if source_type == "ambiguous":
-        # Try git first, fall back to restic
         vault = _vault_path()
-        try:
-            git_restore_file(vault, source, filepath, output)
-            print(f"Restored {filepath} from git commit {source} -> {output}")
+        if not (vault / ".git").exists():
+            # No repository in the vault, so only restic can have the file
+            source_type = "restic"
+        elif args.prefer == "restic":
+            _restore_restic_then_git(vault, source, filepath, output, git_batch)
             return
-        except FileNotFoundError:
-            pass
-
-        try:
-            restic_restore_file(source, filepath, output)
-            print(f"Restored {filepath} from restic snapshot {source} -> {output}")
+        else:
+            _restore_git_then_restic(vault, source, filepath, output, git_batch)
             return
-        except FileNotFoundError:
-            print(
-                f"error: '{filepath}' not found in git commit or restic snapshot '{source}'",
-                file=sys.stderr,
-            )
-            sys.exit(1)
 
-    elif source_type == "git":
+    if source_type == "git":
         vault = _vault_path()
         try:
-            git_restore_file(vault, source, filepath, output)
+            git_restore_file(vault, source, filepath, output, batch=git_batch)
             print(f"Restored {filepath} from git commit {source} -> {output}")
         except FileNotFoundError as e:
             print(f"error: {e}", file=sys.stderr)
@@ -171,10 +417,91 @@ def cmd_restore(args: argparse.Namespace) -> None:
             sys.exit(1)
 
 
+# Ends every reply in repl mode: the ASCII record separator, the command's exit
+# status and a newline
+_REPL_END = "\x1e{}\n".format
+
+
+def _run_repl_line(parser: argparse.ArgumentParser, line: str, git_batch: GitCatFile | None) -> int:
+    """Run one repl line as a subcommand and return its exit status."""
+    import shlex
+
+    try:
+        words = shlex.split(line)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if not words:
+        return 0
+
+    try:
+        args = parser.parse_args(words)
+        if args.command is None or args.command == "repl":
+            print("error: expected one of: snapshots, files, log, show, restore", file=sys.stderr)
+            return 2
+        if args.command == "show":
+            cmd_show(args, git_batch=git_batch)
+        elif args.command == "restore":
+            cmd_restore(args, git_batch=git_batch)
+        else:
+            _SUBCOMMANDS[args.command](args)
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        return e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        # One failing command must not end the session or drop its frame
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_repl(args: argparse.Namespace) -> None:  # noqa: ARG001
+    """Run subcommands read from stdin, one per line, in this process.
+
+    Each reply on stdout ends with ``\\x1e``, the exit status and a newline so
+    a parent process can frame the output. One ``git cat-file --batch``
+    process serves every show and restore, and restic snapshot listings are
+    shared through the in-process cache.
+    """
+    import contextlib
+
+    from vault_backup.restore import GitCatFile
+
+    parser = build_parser()
+    vault = Path(os.environ.get("VAULT_PATH", "/vault"))
+    with contextlib.ExitStack() as stack:
+        git_batch = None
+        if (vault / ".git").exists():
+            git_batch = stack.enter_context(GitCatFile(vault))
+        while line := sys.stdin.readline():
+            status = _run_repl_line(parser, line, git_batch)
+            sys.stdout.write(_REPL_END(status))
+            sys.stdout.flush()
+
+
+_SUBCOMMANDS: dict[str, Callable[[argparse.Namespace], None]] = {
+    "snapshots": cmd_snapshots,
+    "files": cmd_files,
+    "log": cmd_log,
+    "show": cmd_show,
+    "restore": cmd_restore,
+    "repl": cmd_repl,
+}
+
+_PROG = "vault-backup-restore"
+
+# Printed for a bare invocation without building the full parser
+_SHORT_USAGE = f"""\
+usage: {_PROG} [-h] [--version] [-v] {{snapshots,files,log,show,restore,repl}} ...
+
+Run '{_PROG} --help' for details."""
+
+
 def build_parser() -> argparse.ArgumentParser:
     """Build the argument parser."""
     parser = argparse.ArgumentParser(
-        prog="vault-backup-restore",
+        prog=_PROG,
         description="Browse and restore files from Obsidian vault backups.",
     )
     parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
@@ -185,47 +512,66 @@ def build_parser() -> argparse.ArgumentParser:
     # snapshots
     sp = sub.add_parser("snapshots", help="list restic snapshots")
     sp.add_argument("--tag", default="obsidian", help="filter by tag (default: obsidian)")
-    sp.set_defaults(func=cmd_snapshots)
+    sp.add_argument(
+        "--no-cache", action="store_true", help="ignore the on-disk snapshot listing cache"
+    )
 
     # files
     sp = sub.add_parser("files", help="list files in a restic snapshot")
     sp.add_argument("snapshot_id", help="restic snapshot ID")
     sp.add_argument("--path", default="/", help="filter by path prefix")
-    sp.set_defaults(func=cmd_files)
 
     # log
     sp = sub.add_parser("log", help="show git commit history")
     sp.add_argument("--file", help="show history for a specific file")
     sp.add_argument("--count", type=int, default=20, help="number of commits (default: 20)")
-    sp.set_defaults(func=cmd_log)
+    sp.add_argument("--no-cache", action="store_true", help="ignore the on-disk log cache")
 
     # show
     sp = sub.add_parser("show", help="show file content at a git commit")
     sp.add_argument("commit", help="git commit hash")
     sp.add_argument("path", help="file path within the vault")
-    sp.set_defaults(func=cmd_show)
 
     # restore
     sp = sub.add_parser("restore", help="restore a file from git or restic")
     sp.add_argument("source", help="git commit hash or restic snapshot ID")
     sp.add_argument("path", help="file path to restore")
     sp.add_argument("--output", "-o", help="output path (default: filename in current dir)")
-    sp.set_defaults(func=cmd_restore)
+    sp.add_argument(
+        "--prefer",
+        choices=["git", "restic"],
+        default="git",
+        help="which backend to try first for an 8-character ID (default: git)",
+    )
+
+    # repl
+    sub.add_parser("repl", help="run subcommands read from stdin, one per line")
 
     return parser
 
 
 def main() -> None:
     """CLI entry point."""
-    _configure_logging()
+    # Answer the argument-free cases before building any argparse objects
+    argv = sys.argv[1:]
+    if not argv:
+        print(_SHORT_USAGE)
+        sys.exit(1)
+    if argv == ["--version"]:
+        print(f"{_PROG} {__version__}")
+        return
+
     parser = build_parser()
     args = parser.parse_args()
 
+    # Without -v the CLI logs nothing below WARNING, and logging's last-resort
+    # handler already prints those to stderr
     if args.verbose:
+        _configure_logging()
         logging.getLogger().setLevel(logging.DEBUG)
 
-    if not hasattr(args, "func"):
+    if args.command is None:
         parser.print_help()
         sys.exit(1)
 
-    args.func(args)
+    _SUBCOMMANDS[args.command](args)
@@ -4,7 +4,6 @@ from __future__ import annotations
 
 import html
 import logging
-from datetime import datetime
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse
 
@@ -392,18 +391,6 @@ function toggleTheme() {
 # --- Helpers ---
 
 
-def _format_time(iso_str: str) -> str:
-    """Format ISO timestamp for display."""
-    if not iso_str:
-        return ""
-    try:
-        clean = iso_str.replace("Z", "+00:00")
-        dt = datetime.fromisoformat(clean)
-        return dt.strftime("%Y-%m-%d %H:%M")
-    except (ValueError, TypeError):
-        return iso_str
-
-
 def _format_size(size: int) -> str:
     """Format byte size for display."""
     if size == 0:
@@ -474,7 +461,7 @@ def _render_snapshots(snapshots: list[ResticSnapshot]) -> str:
     rows = ""
     for s in snapshots:
         sid = html.escape(s.short_id)
-        time_str = html.escape(_format_time(s.time))
+        time_str = html.escape(s.display_time)
         paths = html.escape(", ".join(s.paths))
         tags = html.escape(", ".join(s.tags))
         rows += (
@@ -542,7 +529,7 @@ def _render_files(
             continue
         esc_name = html.escape(name)
         size = _format_size(e.size) if e.type == "file" else "-"
-        mtime = html.escape(_format_time(e.mtime))
+        mtime = html.escape(e.display_time)
 
         if e.type == "dir":
             rows += (
@@ -590,7 +577,7 @@ def _render_log(commits: list[GitCommit], file_path: str = "") -> str:
     rows = ""
     for c in commits:
         short = html.escape(c.short_hash)
-        date = html.escape(_format_time(c.date))
+        date = html.escape(c.display_date)
         msg = html.escape(c.message)
         if file_path:
             fp = html.escape(file_path)
@@ -616,7 +603,7 @@ def _render_log(commits: list[GitCommit], file_path: str = "") -> str:
 def _render_commit_files(commit: GitCommit, changes: list[GitFileChange]) -> str:
     """Render the list of files changed in a git commit."""
     short = html.escape(commit.short_hash)
-    date = html.escape(_format_time(commit.date))
+    date = html.escape(commit.display_date)
     msg = html.escape(commit.message)
 
     breadcrumb = (
@@ -2,12 +2,24 @@
 
 from __future__ import annotations
 
+import argparse
+import copy
+import functools
+import io
+from collections.abc import Callable, Iterator
+from http.client import HTTPConnection
+from http.server import HTTPServer
 from pathlib import Path
+from threading import Thread
 from unittest.mock import MagicMock
 
 import pytest
 
 from vault_backup.config import Config, LLMConfig, NotifyConfig, NotifyLevel, RetentionPolicy
+from vault_backup.health import HealthState, _set_health_state
+from vault_backup.restore import GitCommit, ResticEntry, ResticSnapshot
+from vault_backup.restore_cli import build_parser
+from vault_backup.ui import RestoreHandler
 
 
 @pytest.fixture()
@@ -102,3 +114,162 @@ def mock_subprocess(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
     mock.return_value.stderr = ""
     monkeypatch.setattr("subprocess.run", mock)
     return mock
+
+
+@pytest.fixture()
+def mock_popen(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    """Mock subprocess.Popen for commands whose stdout is streamed.
+
+    Set ``mock_popen.return_value.stdout`` to an ``io.BytesIO`` with the output.
+    """
+    mock = MagicMock()
+    proc = mock.return_value
+    proc.__enter__.return_value = proc
+    proc.returncode = 0
+    proc.stdout = io.BytesIO(b"")
+    monkeypatch.setattr("subprocess.Popen", mock)
+    return mock
+
+
+@pytest.fixture(scope="session")
+def parser() -> argparse.ArgumentParser:
+    """The restore CLI parser, built once; ``parse_args`` leaves it unchanged."""
+    return build_parser()
+
+
+@pytest.fixture(scope="session")
+def parse(parser: argparse.ArgumentParser) -> Callable[..., argparse.Namespace]:
+    """Parse restore CLI arguments, memoized by argv.
+
+    Each call returns its own shallow copy, so a test may change the result.
+    """
+    parse_argv = functools.cache(parser.parse_args)
+
+    def parse(*argv: str) -> argparse.Namespace:
+        return copy.copy(parse_argv(argv))
+
+    return parse
+
+
+# Immutable sample records, built once and shared as-is.
+
+
+@pytest.fixture(scope="session")
+def sample_snapshot() -> ResticSnapshot:
+    """A tagged restic snapshot of /vault."""
+    return ResticSnapshot(
+        id="a" * 64,
+        short_id="abcdef12",
+        time="2025-01-15T10:30:00Z",
+        paths=("/vault",),
+        tags=("obsidian",),
+    )
+
+
+@pytest.fixture(scope="session")
+def sample_commit() -> GitCommit:
+    """A vault commit."""
+    return GitCommit(
+        hash="a" * 40,
+        short_hash="abc123d",
+        date="2025-01-15T10:30:00+00:00",
+        message="update notes",
+    )
+
+
+@pytest.fixture(scope="session")
+def sample_entry_file() -> ResticEntry:
+    """A file entry from ``restic ls``."""
+    return ResticEntry(path="/vault/note.md", type="file", size=2048, mtime="2025-01-15T10:30:00Z")
+
+
+@pytest.fixture(scope="session")
+def sample_entry_dir() -> ResticEntry:
+    """A directory entry from ``restic ls``."""
+    return ResticEntry(path="/vault/dir", type="dir", size=0, mtime="")
+
+
+# --- Restore UI server, shared by the whole session ---
+
+
+@pytest.fixture(scope="session")
+def ui_vault(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Vault directory configured for the shared UI server."""
+    return tmp_path_factory.mktemp("ui_vault")
+
+
+@pytest.fixture(scope="session")
+def ui_config(ui_vault: Path, tmp_path_factory: pytest.TempPathFactory) -> Config:
+    """Config the shared UI server's health state is built from."""
+    return Config(
+        vault_path=str(ui_vault),
+        state_dir=str(tmp_path_factory.mktemp("ui_state")),
+        debounce_seconds=1,
+        health_port=0,
+    )
+
+
+class _KeepAliveRestoreHandler(RestoreHandler):
+    """RestoreHandler speaking HTTP/1.1 so the test client can reuse one connection.
+
+    Production keeps HTTP/1.0: its server is single-threaded, and an idle
+    keep-alive connection would block health probes. Nagle is disabled so the
+    separate header and body writes aren't held back waiting on delayed ACKs.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+
+@pytest.fixture(scope="session")
+def ui_server_address() -> Iterator[tuple[str, int]]:
+    """Start one real HTTP server with RestoreHandler for the whole session.
+
+    Under pytest-xdist that is one server per worker, each on its own
+    ephemeral port. Tests swap the ``vault_backup.ui`` helpers rather than
+    touching the server, so a single instance serves every test; pair it with
+    ``reset_health_state`` for endpoints that need a vault.
+    """
+    server = HTTPServer(("127.0.0.1", 0), _KeepAliveRestoreHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "127.0.0.1", server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def ui_server(ui_server_address: tuple[str, int]) -> Iterator[HTTPConnection]:
+    """A keep-alive connection to the shared UI server, for this test only.
+
+    Requests within a test reuse it. Closing it afterwards means a test that
+    fails mid-response cannot leave unread data for the next one, and frees
+    the single-threaded server for the next connection.
+    """
+    conn = HTTPConnection(*ui_server_address, timeout=10)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture()
+def restore_handler_url() -> Iterator[str]:
+    """Base URL of a server running the production, HTTP/1.0 RestoreHandler."""
+    server = HTTPServer(("127.0.0.1", 0), RestoreHandler)
+    # A short poll interval keeps shutdown() from adding 0.5s to every test
+    thread = Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def reset_health_state(ui_config: Config) -> Iterator[HealthState]:
+    """Install a fresh health state for the shared UI server, cleared afterwards.
+
+    Under pytest-xdist each worker process has its own server and state.
+    """
+    state = HealthState(config=ui_config)
+    _set_health_state(state)
+    yield state
+    _set_health_state(None)
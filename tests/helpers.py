@@ -0,0 +1,77 @@
+"""Plain helpers shared by the test modules.
+
+Kept out of conftest.py so tests can import them by name; conftest is loaded
+by pytest itself and is not importable under ``--import-mode=importlib``.
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NoReturn
+
+
+@contextmanager
+def swap[T](obj: object, name: str, value: T) -> Iterator[T]:
+    """Temporarily replace ``obj.name`` with *value*, yielding *value*.
+
+    A plain setattr/restore, without ``unittest.mock.patch``'s target lookup
+    and introspection. Swap in a ``MagicMock`` when the test asserts on calls.
+    """
+    old = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield value
+    finally:
+        setattr(obj, name, old)
+
+
+def raising(exc: BaseException | type[BaseException]) -> Callable[..., NoReturn]:
+    """Return a stand-in that raises *exc* whatever it is called with.
+
+    For failure-path swaps that never assert on calls, so need no ``MagicMock``.
+    """
+
+    def fail(*_args: object, **_kwargs: object) -> NoReturn:
+        raise exc
+
+    return fail
+
+
+# --- Restore CLI argument namespaces, mirroring build_parser() defaults ---
+
+
+def snap_args(tag: str = "obsidian", *, no_cache: bool = False) -> argparse.Namespace:
+    """Arguments for ``cmd_snapshots``."""
+    return argparse.Namespace(tag=tag, no_cache=no_cache)
+
+
+def files_args(snapshot_id: str = "abcdef12", path: str = "/") -> argparse.Namespace:
+    """Arguments for ``cmd_files``."""
+    return argparse.Namespace(snapshot_id=snapshot_id, path=path)
+
+
+def log_args(
+    file: str | None = None, count: int = 20, *, no_cache: bool = False
+) -> argparse.Namespace:
+    """Arguments for ``cmd_log``."""
+    return argparse.Namespace(file=file, count=count, no_cache=no_cache)
+
+
+def show_args(commit: str = "abc123d", path: str = "note.md") -> argparse.Namespace:
+    """Arguments for ``cmd_show``."""
+    return argparse.Namespace(commit=commit, path=path)
+
+
+def restore_args(
+    source: str, path: str, output: str | Path | None = None, *, prefer: str = "git"
+) -> argparse.Namespace:
+    """Arguments for ``cmd_restore``; *output* may be a Path."""
+    return argparse.Namespace(
+        source=source,
+        path=path,
+        output=None if output is None else str(output),
+        prefer=prefer,
+    )
@@ -4,6 +4,8 @@ from __future__ import annotations
 
 import json
 import subprocess
+import sys
+import threading
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -25,6 +27,7 @@ from vault_backup.backup import (
     restic_prune,
     run_backup,
     run_cmd,
+    run_cmd_to_file,
 )
 from vault_backup.config import Config, LLMConfig
 
@@ -42,6 +45,34 @@ class TestRunCmd:
         assert kwargs["cwd"] == Path("/tmp")
 
 
+class TestRunCmdToFile:
+    def test_streams_stdout_to_target(self, tmp_path: Path) -> None:
+        target = tmp_path / "out" / "note.md"
+        cmd = [sys.executable, "-c", "import sys; sys.stdout.buffer.write(b'\\x00binary')"]
+        result = run_cmd_to_file(cmd, target)
+        assert result.returncode == 0
+        assert target.read_bytes() == b"\x00binary"
+        assert list(target.parent.iterdir()) == [target]
+
+    def test_failure_keeps_existing_file(self, tmp_path: Path) -> None:
+        target = tmp_path / "note.md"
+        target.write_text("original")
+        cmd = [sys.executable, "-c", "print('partial'); raise SystemExit(1)"]
+        result = run_cmd_to_file(cmd, target)
+        assert result.returncode == 1
+        assert target.read_text() == "original"
+        assert list(tmp_path.iterdir()) == [target]
+
+    def test_cancel_terminates_command(self, tmp_path: Path) -> None:
+        target = tmp_path / "note.md"
+        cancel = threading.Event()
+        cancel.set()
+        cmd = [sys.executable, "-c", "import time; print('partial', flush=True); time.sleep(30)"]
+        result = run_cmd_to_file(cmd, target, cancel=cancel)
+        assert result.returncode != 0
+        assert list(tmp_path.iterdir()) == []
+
+
 class TestHasChanges:
     def test_detects_changes(self, mock_subprocess: MagicMock) -> None:
         mock_subprocess.return_value.stdout = " M file.md\n"
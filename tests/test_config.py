@@ -151,6 +151,11 @@ class TestConfig:
         assert config.git_user_email == "test@example.com"
         assert config.dry_run is True
 
+    def test_strict_write_probe_from_env(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        assert Config.from_env().strict_write_probe is False
+        monkeypatch.setenv("VAULT_STRICT_WRITE_PROBE", "yes")
+        assert Config.from_env().strict_write_probe is True
+
     def test_default_excluded_paths(self) -> None:
         """`.claude` is excluded by default — protects client-owned config."""
         assert Config().excluded_paths == (".claude",)
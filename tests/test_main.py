@@ -0,0 +1,341 @@
+"""Tests for vault_backup.__main__."""
+
+from __future__ import annotations
+
+import dataclasses
+import importlib.util
+import json
+import logging
+import os
+import subprocess
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from pythonjsonlogger.json import JsonFormatter
+
+from vault_backup.__main__ import (
+    _GIT_CONFIG_INCLUDE,
+    VaultLayout,
+    _FastStdoutHandler,
+    _init_sentry,
+    _LazySentryHandler,
+    _PreSerializedFieldsMixin,
+    _run_git_silent,
+    _scan_vault_state,
+    _validated_env,
+    _write_git_config,
+    initialize_state_dir,
+    validate_environment,
+)
+from vault_backup.config import Config
+
+
+def _git_config(repo: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "config", *args], cwd=repo, capture_output=True, text=True, check=True
+    ).stdout
+
+
+def _orjson_formatter() -> type[JsonFormatter]:
+    from pythonjsonlogger.orjson import OrjsonFormatter
+
+    return OrjsonFormatter
+
+
+_JSON_BASES = [
+    pytest.param(lambda: JsonFormatter, id="json"),
+    pytest.param(
+        _orjson_formatter,
+        id="orjson",
+        marks=pytest.mark.skipif(
+            importlib.util.find_spec("orjson") is None, reason="needs the fast extra"
+        ),
+    ),
+]
+_STATIC = {"service": "vault-backup", "version": "1.0.0"}
+
+
+class TestPreSerializedJsonFormatter:
+    @pytest.fixture(params=_JSON_BASES)
+    def base(self, request: pytest.FixtureRequest) -> type[JsonFormatter]:
+        return request.param()
+
+    @staticmethod
+    def _formatter(base: type[JsonFormatter], **kwargs: object) -> JsonFormatter:
+        cls = type("Formatter", (_PreSerializedFieldsMixin, base), {})
+        return cls(fmt="%(levelname)s %(message)s", rename_fields={"levelname": "level"}, **kwargs)
+
+    def test_splices_static_fields(self, base: type[JsonFormatter]) -> None:
+        out = self._formatter(base, static_fields=_STATIC).format(
+            logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+        )
+        data = json.loads(out)
+        assert data == {**_STATIC, "level": "INFO", "message": "hello"}
+        # Re-encoding with the base gives the same text, separators included
+        assert out == base().jsonify_log_record(data)
+
+    def test_exc_info(self, base: type[JsonFormatter]) -> None:
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            exc_info = sys.exc_info()
+        record = logging.makeLogRecord(
+            {"msg": "failed", "levelname": "ERROR", "exc_info": exc_info}
+        )
+        data = json.loads(self._formatter(base, static_fields=_STATIC).format(record))
+        assert data["service"] == "vault-backup"
+        assert "RuntimeError: boom" in data["exc_info"]
+
+    def test_without_static_fields(self, base: type[JsonFormatter]) -> None:
+        out = self._formatter(base).format(
+            logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+        )
+        assert json.loads(out) == {"level": "INFO", "message": "hello"}
+
+    def test_empty_record(self, base: type[JsonFormatter]) -> None:
+        formatter = self._formatter(base, static_fields=_STATIC)
+        assert json.loads(formatter.serialize_log_record({})) == _STATIC
+
+
+class TestFastStdoutHandler:
+    @pytest.fixture()
+    def pipe(self, monkeypatch: pytest.MonkeyPatch) -> Iterator[tuple[int, _FastStdoutHandler]]:
+        """A handler writing to a pipe, and the pipe's read end."""
+        read_fd, write_fd = os.pipe()
+        with open(write_fd, "w") as stdout, open(read_fd, "rb", buffering=0):
+            monkeypatch.setattr("sys.stdout", stdout)
+            handler = _FastStdoutHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            yield read_fd, handler
+
+    def test_one_write_per_record(
+        self, pipe: tuple[int, _FastStdoutHandler], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        read_fd, handler = pipe
+        writes = MagicMock(wraps=os.write)
+        monkeypatch.setattr(os, "write", writes)
+        handler.emit(logging.makeLogRecord({"msg": "hello"}))
+        writes.assert_called_once()
+        assert os.read(read_fd, 64) == b"hello\n"
+
+    def test_retries_partial_writes(
+        self, pipe: tuple[int, _FastStdoutHandler], monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        read_fd, handler = pipe
+        real_write = os.write
+        monkeypatch.setattr(os, "write", lambda fd, data: real_write(fd, data[:3]))
+        handler.emit(logging.makeLogRecord({"msg": "partial write"}))
+        assert os.read(read_fd, 64) == b"partial write\n"
+
+
+class TestValidateEnvironment:
+    @pytest.fixture(autouse=True)
+    def _clear_env_cache(self) -> Iterator[None]:
+        _validated_env.cache_clear()
+        yield
+        _validated_env.cache_clear()
+
+    def test_masks_repository(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setenv("RESTIC_REPOSITORY", "s3:bucket/path")
+        monkeypatch.setenv("RESTIC_PASSWORD", "secret")
+        assert validate_environment() == "s3:***"
+
+    @pytest.mark.parametrize("value", [None, ""])
+    def test_missing_or_empty_exits(
+        self, monkeypatch: pytest.MonkeyPatch, value: str | None
+    ) -> None:
+        monkeypatch.setenv("RESTIC_REPOSITORY", "s3:bucket/path")
+        if value is None:
+            monkeypatch.delenv("RESTIC_PASSWORD", raising=False)
+        else:
+            monkeypatch.setenv("RESTIC_PASSWORD", value)
+        assert _validated_env()[1] == ("RESTIC_PASSWORD",)
+        with pytest.raises(SystemExit, match="1"):
+            validate_environment()
+
+    def test_reads_environment_once(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setenv("RESTIC_REPOSITORY", "s3:bucket/path")
+        monkeypatch.setenv("RESTIC_PASSWORD", "secret")
+        first = _validated_env()
+        monkeypatch.setenv("RESTIC_REPOSITORY", "b2:other")
+        assert _validated_env() is first
+        assert validate_environment() == "s3:***"
+
+
+class TestScanVaultState:
+    def test_fresh_vault(self, tmp_vault: Path, tmp_path: Path) -> None:
+        state_dir = tmp_path / "new" / "state"
+        layout = _scan_vault_state(tmp_vault, state_dir)
+        assert state_dir.is_dir()
+        assert layout == VaultLayout(
+            has_git=False, has_gitignore=False, existing_state_files=frozenset(), writable=True
+        )
+
+    def test_existing_repo(self, tmp_vault: Path, tmp_state_dir: Path) -> None:
+        (tmp_vault / ".git").mkdir()
+        (tmp_vault / ".gitignore").write_text("")
+        layout = _scan_vault_state(tmp_vault, tmp_state_dir)
+        assert layout.has_git
+        assert layout.has_gitignore
+
+    def test_partial_state_files(self, tmp_vault: Path, tmp_state_dir: Path) -> None:
+        (tmp_state_dir / "last_commit").write_text("0")
+        (tmp_state_dir / "pending_changes").write_text("false")
+        layout = _scan_vault_state(tmp_vault, tmp_state_dir)
+        assert layout.existing_state_files == {"last_commit", "pending_changes"}
+
+    def test_missing_vault_exits(self, tmp_path: Path, tmp_state_dir: Path) -> None:
+        with pytest.raises(SystemExit, match="1"):
+            _scan_vault_state(tmp_path / "missing", tmp_state_dir)
+
+    def test_vault_is_a_file_exits(self, tmp_path: Path, tmp_state_dir: Path) -> None:
+        vault = tmp_path / "vault.md"
+        vault.write_text("")
+        with pytest.raises(SystemExit, match="1"):
+            _scan_vault_state(vault, tmp_state_dir)
+
+    def test_unlistable_vault_exits(
+        self, tmp_vault: Path, tmp_state_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        # Mode bits don't stop root, so deny the listing directly
+        real_scandir = os.scandir
+
+        def scandir(path: Path) -> Iterator[os.DirEntry[str]]:
+            if Path(path) == tmp_vault:
+                raise PermissionError(13, "Permission denied", str(path))
+            return real_scandir(path)
+
+        monkeypatch.setattr(os, "scandir", scandir)
+        with pytest.raises(SystemExit, match="1"):
+            _scan_vault_state(tmp_vault, tmp_state_dir)
+
+    def test_strict_probe_leaves_no_file(self, tmp_vault: Path, tmp_state_dir: Path) -> None:
+        layout = _scan_vault_state(tmp_vault, tmp_state_dir, strict_write_probe=True)
+        assert layout.writable
+        assert not (tmp_vault / ".backup-write-test").exists()
+
+
+class TestInitializeStateDir:
+    def test_creates_missing_files(self, tmp_vault: Path, tmp_state_dir: Path) -> None:
+        (tmp_state_dir / "last_commit").write_text("1700000000")
+        initialize_state_dir(tmp_state_dir, _scan_vault_state(tmp_vault, tmp_state_dir))
+        assert (tmp_state_dir / "last_commit").read_text() == "1700000000"
+        assert (tmp_state_dir / "last_backup").read_text() == "0"
+        assert (tmp_state_dir / "pending_changes").read_text() == "false"
+
+    def test_keeps_file_created_after_scan(self, tmp_vault: Path, tmp_state_dir: Path) -> None:
+        layout = _scan_vault_state(tmp_vault, tmp_state_dir)
+        (tmp_state_dir / "last_backup").write_text("1700000000")
+        initialize_state_dir(tmp_state_dir, layout)
+        assert (tmp_state_dir / "last_backup").read_text() == "1700000000"
+        assert (tmp_state_dir / "last_commit").read_text() == "0"
+
+
+class TestLazySentry:
+    @pytest.fixture()
+    def sentry_sdk(self, monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+        fake = MagicMock()
+        monkeypatch.setitem(sys.modules, "sentry_sdk", fake)
+        return fake
+
+    @pytest.fixture()
+    def sentry_config(self, default_config: Config) -> Config:
+        return dataclasses.replace(default_config, sentry_dsn="https://key@sentry.example/1")
+
+    @staticmethod
+    def _record(level: int, msg: str = "boom") -> logging.LogRecord:
+        return logging.LogRecord("vault_backup", level, __file__, 1, msg, None, None)
+
+    def test_not_armed_without_dsn(self, default_config: Config) -> None:
+        root = logging.getLogger()
+        before = list(root.handlers)
+        _init_sentry(default_config)
+        assert root.handlers == before
+
+    def test_ignores_records_below_error(
+        self, sentry_config: Config, sentry_sdk: MagicMock
+    ) -> None:
+        logger = logging.Logger("lazy-sentry-test")
+        logger.addHandler(_LazySentryHandler(sentry_config))
+        logger.warning("not yet")
+        sentry_sdk.init.assert_not_called()
+        logger.error("now")
+        sentry_sdk.init.assert_called_once()
+
+    def test_first_error_initializes_once(
+        self, sentry_config: Config, sentry_sdk: MagicMock
+    ) -> None:
+        handler = _LazySentryHandler(sentry_config)
+        handler.handle(self._record(logging.ERROR, "first"))
+        handler.handle(self._record(logging.ERROR, "second"))
+        sentry_sdk.init.assert_called_once()
+        assert sentry_sdk.init.call_args.kwargs["dsn"] == sentry_config.sentry_dsn
+        sentry_sdk.capture_message.assert_called_once_with("first", level="error")
+
+    def test_sends_triggering_exception(self, sentry_config: Config, sentry_sdk: MagicMock) -> None:
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            record = self._record(logging.ERROR)
+            record.exc_info = sys.exc_info()
+        _LazySentryHandler(sentry_config).handle(record)
+        sentry_sdk.capture_exception.assert_called_once_with(record.exc_info)
+        sentry_sdk.capture_message.assert_not_called()
+
+
+class TestRunGitSilent:
+    def test_captures_stdout_on_request(self, tmp_path: Path) -> None:
+        assert _run_git_silent(["git", "--version"], cwd=tmp_path).stdout is None
+        result = _run_git_silent(["git", "--version"], cwd=tmp_path, capture=True)
+        assert result.stdout.startswith(b"git version ")
+
+    def test_logs_stderr_on_failure(self, tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+        with caplog.at_level(logging.ERROR), pytest.raises(subprocess.CalledProcessError):
+            _run_git_silent(["git", "remote", "add", "origin", "x"], cwd=tmp_path)
+        [record] = caplog.records
+        assert record.returncode != 0
+        assert "not a git repository" in record.stderr
+
+    def test_unchecked_failure_is_quiet(
+        self, tmp_path: Path, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        result = _run_git_silent(["git", "remote", "add", "origin", "x"], cwd=tmp_path, check=False)
+        assert result.returncode != 0
+        assert caplog.records == []
+
+
+class TestWriteGitConfig:
+    @pytest.fixture()
+    def repo(self, tmp_vault: Path) -> Path:
+        subprocess.run(["git", "init", "-q"], cwd=tmp_vault, check=True)
+        return tmp_vault
+
+    def test_writes_include_file(self, repo: Path, default_config: Config) -> None:
+        _write_git_config(repo, default_config)
+        assert _git_config(repo, "--get-all", "include.path") == f"{_GIT_CONFIG_INCLUDE}\n"
+        assert _git_config(repo, "user.name") == "Obsidian Backup\n"
+        assert _git_config(repo, "user.email") == "backup@local\n"
+        assert _git_config(repo, "core.autocrlf") == "input\n"
+
+    def test_escapes_quotes_and_backslashes(self, repo: Path, default_config: Config) -> None:
+        config = dataclasses.replace(default_config, git_user_name='Ann "A\\B" Lee')
+        _write_git_config(repo, config)
+        assert _git_config(repo, "user.name") == 'Ann "A\\B" Lee\n'
+
+    def test_already_included_is_not_repeated(self, repo: Path, default_config: Config) -> None:
+        _write_git_config(repo, default_config)
+        _write_git_config(repo, default_config)
+        assert _git_config(repo, "--get-all", "include.path") == f"{_GIT_CONFIG_INCLUDE}\n"
+
+    def test_keeps_other_includes(self, repo: Path, default_config: Config) -> None:
+        _git_config(repo, "include.path", "other.gitconfig")
+        _git_config(repo, "--add", "include.path", f"{_GIT_CONFIG_INCLUDE}.bak")
+        _write_git_config(repo, default_config)
+        assert _git_config(repo, "--get-all", "include.path").splitlines() == [
+            "other.gitconfig",
+            f"{_GIT_CONFIG_INCLUDE}.bak",
+            _GIT_CONFIG_INCLUDE,
+        ]
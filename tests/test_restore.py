@@ -2,32 +2,46 @@
 
 from __future__ import annotations
 
+import io
 import json
+from collections.abc import Callable
 from pathlib import Path
 from unittest.mock import MagicMock
 
 import pytest
 
 from vault_backup.restore import (
+    GitCatFile,
     GitCommit,
     GitFileChange,
     ResticEntry,
     ResticSnapshot,
+    check_restic_repository,
     detect_source,
+    format_display_time,
     git_diff_file,
     git_diff_tree,
     git_file_history,
+    git_head,
     git_log,
     git_log_single,
     git_restore_file,
     git_show_file,
     group_entries_by_directory,
+    invalidate_restic_cache,
+    restic_latest_snapshot_ids,
     restic_ls,
     restic_restore_file,
     restic_show_file,
     restic_snapshots,
 )
 
+
+@pytest.fixture(autouse=True)
+def _clear_snapshot_cache() -> None:
+    invalidate_restic_cache()
+
+
 # --- Data class construction ---
 
 
@@ -40,11 +54,14 @@ class TestDataClasses:
 
     def test_restic_snapshot_fields(self) -> None:
         s = ResticSnapshot(
-            id="abcdef12", short_id="abcdef12", time="2025-01-01T00:00:00Z",
-            paths=["/vault"], tags=["obsidian"],
+            id="abcdef12",
+            short_id="abcdef12",
+            time="2025-01-01T00:00:00Z",
+            paths=("/vault",),
+            tags=("obsidian",),
         )
         assert s.short_id == "abcdef12"
-        assert s.tags == ["obsidian"]
+        assert s.tags == ("obsidian",)
 
     def test_restic_entry_fields(self) -> None:
         e = ResticEntry(path="/vault/note.md", type="file", size=1024, mtime="2025-01-01T00:00:00Z")
@@ -56,7 +73,7 @@ class TestDataClasses:
             c.hash = "xyz"  # type: ignore[misc]
 
     def test_frozen_restic_snapshot(self) -> None:
-        s = ResticSnapshot(id="abc", short_id="ab", time="t", paths=[], tags=[])
+        s = ResticSnapshot(id="abc", short_id="ab", time="t", paths=(), tags=())
         with pytest.raises(AttributeError):
             s.id = "xyz"  # type: ignore[misc]
 
@@ -72,14 +89,14 @@ class TestDataClasses:
 class TestGitLog:
     def test_parses_commits(self, mock_subprocess: MagicMock) -> None:
         mock_subprocess.return_value.stdout = (
-            "abc123def456789012345678901234567890abcd\n"
-            "abc123d\n"
-            "2025-01-15T10:30:00+00:00\n"
-            "update daily notes\n"
-            "def456abc789012345678901234567890abcdef12\n"
-            "def456a\n"
-            "2025-01-14T09:00:00+00:00\n"
-            "add weekly review\n"
+            "abc123def456789012345678901234567890abcd\0"
+            "abc123d\0"
+            "2025-01-15T10:30:00+00:00\0"
+            "update daily notes\0"
+            "def456abc789012345678901234567890abcdef12\0"
+            "def456a\0"
+            "2025-01-14T09:00:00+00:00\0"
+            "add weekly review\0"
         )
         mock_subprocess.return_value.returncode = 0
         commits = git_log(Path("/vault"), count=5)
@@ -88,6 +105,18 @@ class TestGitLog:
         assert commits[0].message == "update daily notes"
         assert commits[1].message == "add weekly review"
 
+    def test_uses_nul_separated_records(self, mock_subprocess: MagicMock) -> None:
+        git_log(Path("/vault"))
+        cmd = mock_subprocess.call_args[0][0]
+        assert "-z" in cmd
+        assert "--format=%H%x00%h%x00%aI%x00%s" in cmd
+
+    def test_suppresses_diff_notes_and_decorations(self, mock_subprocess: MagicMock) -> None:
+        git_log(Path("/vault"))
+        cmd = mock_subprocess.call_args[0][0]
+        for flag in ("-s", "--no-notes", "--no-decorate", "--no-color"):
+            assert flag in cmd
+
     def test_empty_repo(self, mock_subprocess: MagicMock) -> None:
         mock_subprocess.return_value.stdout = ""
         mock_subprocess.return_value.returncode = 128
@@ -103,10 +132,10 @@ class TestGitLog:
 class TestGitLogSingle:
     def test_returns_single_commit(self, mock_subprocess: MagicMock) -> None:
         mock_subprocess.return_value.stdout = (
-            "abc123def456789012345678901234567890abcd\n"
-            "abc123d\n"
-            "2025-01-15T10:30:00+00:00\n"
-            "update daily notes\n"
+            "abc123def456789012345678901234567890abcd\0"
+            "abc123d\0"
+            "2025-01-15T10:30:00+00:00\0"
+            "update daily notes\0"
         )
         mock_subprocess.return_value.returncode = 0
         commits = git_log_single(Path("/vault"), "abc123d")
@@ -124,10 +153,10 @@ class TestGitLogSingle:
 class TestGitFileHistory:
     def test_follows_renames(self, mock_subprocess: MagicMock) -> None:
         mock_subprocess.return_value.stdout = (
-            "abc123def456789012345678901234567890abcd\n"
-            "abc123d\n"
-            "2025-01-15T10:30:00+00:00\n"
-            "rename daily note\n"
+            "abc123def456789012345678901234567890abcd\0"
+            "abc123d\0"
+            "2025-01-15T10:30:00+00:00\0"
+            "rename daily note\0"
         )
         mock_subprocess.return_value.returncode = 0
         commits = git_file_history(Path("/vault"), "notes/daily.md")
@@ -158,22 +187,158 @@ class TestGitShowFile:
             git_show_file(Path("/vault"), "abc123d", "gone.md")
 
 
+class _FakeCatFile:
+    """Stand-in for a ``git cat-file --batch`` Popen object."""
+
+    def __init__(self, responses: bytes, returncode: int | None = None) -> None:
+        self.stdin = io.BytesIO()
+        self.stdout = io.BytesIO(responses)
+        self.returncode = returncode
+
+    def poll(self) -> int | None:
+        return self.returncode
+
+    def wait(self, timeout: float | None = None) -> int:  # noqa: ARG002
+        self.returncode = 0
+        return 0
+
+
+class TestFormatDisplayTime:
+    @pytest.mark.parametrize(
+        ("iso", "expected"),
+        [
+            ("2025-01-15T10:30:00+00:00", "2025-01-15 10:30"),
+            ("2025-01-15T10:30:00Z", "2025-01-15 10:30"),
+            ("2025-01-15T10:30:00.123456789+01:00", "2025-01-15 10:30"),  # restic nanoseconds
+            ("2025-01-15", "2025-01-15 00:00"),  # date only, via the fromisoformat fallback
+            ("not-a-date", "not-a-date"),
+            ("", ""),
+        ],
+    )
+    def test_format(self, iso: str, expected: str) -> None:
+        assert format_display_time(iso) == expected
+
+    def test_display_properties_format_once(self) -> None:
+        e = ResticEntry(path="/vault/a.md", type="file", size=1, mtime="2025-01-15T10:30:00Z")
+        assert e.display_time == "2025-01-15 10:30"
+        assert e.display_time is e.display_time
+        assert e == ResticEntry(
+            path="/vault/a.md", type="file", size=1, mtime="2025-01-15T10:30:00Z"
+        )
+
+
+class TestGitHead:
+    def test_returns_sha(self, mock_subprocess: MagicMock) -> None:
+        mock_subprocess.return_value.stdout = "a" * 40 + "\n"
+        assert git_head(Path("/vault")) == "a" * 40
+
+    def test_none_without_commits(self, mock_subprocess: MagicMock) -> None:
+        mock_subprocess.return_value.returncode = 1
+        assert git_head(Path("/vault")) is None
+
+
+class TestGitCatFile:
+    def test_reuses_one_process(
+        self, mock_subprocess: MagicMock, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        fake = _FakeCatFile(b"abc blob 8\n# Hello\n\nabc123d:gone.md missing\n")
+        popen = MagicMock(return_value=fake)
+        monkeypatch.setattr("subprocess.Popen", popen)
+        with GitCatFile(Path("/vault")) as batch:
+            content = git_show_file(Path("/vault"), "abc123d", "note.md", batch=batch)
+            with pytest.raises(FileNotFoundError, match="not found at commit"):
+                git_show_file(Path("/vault"), "abc123d", "gone.md", batch=batch)
+        assert content == "# Hello\n"
+        popen.assert_called_once()
+        mock_subprocess.assert_not_called()
+
+    def test_restore_reads_through_batch(
+        self, mock_subprocess: MagicMock, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        fake = _FakeCatFile(b"abc blob 8\n# Hello\n\n")
+        monkeypatch.setattr("subprocess.Popen", MagicMock(return_value=fake))
+        target = tmp_path / "out" / "note.md"
+        with GitCatFile(Path("/vault")) as batch:
+            git_restore_file(Path("/vault"), "abc123d", "note.md", target, batch=batch)
+        assert target.read_text() == "# Hello\n"
+        assert list(target.parent.iterdir()) == [target]
+        mock_subprocess.assert_not_called()
+
+    def test_non_blob_is_not_found(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        fake = _FakeCatFile(b"abc tree 3\nxyz\n")
+        monkeypatch.setattr("subprocess.Popen", MagicMock(return_value=fake))
+        with GitCatFile(Path("/vault")) as batch:
+            assert batch.read("abc123d", "notes") is None
+
+    @pytest.mark.parametrize(
+        "filepath",
+        ["Gone Note.md", "Daily  Notes/2025 01 15 missing.md", "a b ambiguous"],
+    )
+    def test_missing_path_with_spaces(self, monkeypatch: pytest.MonkeyPatch, filepath: str) -> None:
+        fake = _FakeCatFile(f"abc123d:{filepath} missing\n".encode() + b"abc blob 2\nok\n")
+        monkeypatch.setattr("subprocess.Popen", MagicMock(return_value=fake))
+        with GitCatFile(Path("/vault")) as batch:
+            assert batch.read("abc123d", filepath) is None
+            assert batch.read("abc123d", "note.md") == b"ok"
+
+    def test_unexpected_header_raises(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        fake = _FakeCatFile(b"fatal: something odd\n")
+        monkeypatch.setattr("subprocess.Popen", MagicMock(return_value=fake))
+        with GitCatFile(Path("/vault")) as batch:
+            with pytest.raises(OSError, match="unexpected git cat-file header"):
+                batch.read("abc123d", "note.md")
+            assert not batch.alive
+
+    def test_falls_back_when_process_died(
+        self, mock_subprocess: MagicMock, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        fake = _FakeCatFile(b"", returncode=128)
+        monkeypatch.setattr("subprocess.Popen", MagicMock(return_value=fake))
+        mock_subprocess.return_value.stdout = "fallback"
+        with GitCatFile(Path("/vault")) as batch:
+            content = git_show_file(Path("/vault"), "abc123d", "note.md", batch=batch)
+        assert content == "fallback"
+        mock_subprocess.assert_called_once()
+
+
+def _stdout_writer(content: bytes, returncode: int = 0) -> Callable[..., MagicMock]:
+    """subprocess.run side effect that writes *content* to the ``stdout=`` file."""
+
+    def run(cmd: list[str], **kwargs: object) -> MagicMock:  # noqa: ARG001
+        kwargs["stdout"].write(content)  # type: ignore[attr-defined]
+        result = MagicMock()
+        result.returncode = returncode
+        return result
+
+    return run
+
+
 class TestGitRestoreFile:
     def test_writes_to_target(self, mock_subprocess: MagicMock, tmp_path: Path) -> None:
-        mock_subprocess.return_value.stdout = "# Restored content\n"
-        mock_subprocess.return_value.returncode = 0
+        mock_subprocess.side_effect = _stdout_writer(b"# Restored content\n")
         target = tmp_path / "restored" / "note.md"
         result = git_restore_file(Path("/vault"), "abc123d", "note.md", target)
         assert result == target
         assert target.read_text() == "# Restored content\n"
+        cmd = mock_subprocess.call_args[0][0]
+        assert cmd == ["git", "show", "abc123d:note.md"]
 
     def test_creates_parent_dirs(self, mock_subprocess: MagicMock, tmp_path: Path) -> None:
-        mock_subprocess.return_value.stdout = "content"
-        mock_subprocess.return_value.returncode = 0
+        mock_subprocess.side_effect = _stdout_writer(b"content")
         target = tmp_path / "deep" / "nested" / "dir" / "file.md"
         git_restore_file(Path("/vault"), "abc", "file.md", target)
         assert target.exists()
 
+    def test_missing_file_keeps_existing_target(
+        self, mock_subprocess: MagicMock, tmp_path: Path
+    ) -> None:
+        mock_subprocess.side_effect = _stdout_writer(b"", returncode=128)
+        target = tmp_path / "note.md"
+        target.write_text("current")
+        with pytest.raises(FileNotFoundError, match="not found at commit"):
+            git_restore_file(Path("/vault"), "abc123d", "note.md", target)
+        assert target.read_text() == "current"
+
 
 class TestGitDiffTree:
     def test_parses_name_status(self, mock_subprocess: MagicMock) -> None:
@@ -266,32 +431,41 @@ class TestResticSnapshots:
                 "tags": ["obsidian"],
             },
         ])
-        mock_subprocess.return_value.stdout = snapshots_json
+        mock_subprocess.return_value.stdout = snapshots_json.encode()
         mock_subprocess.return_value.returncode = 0
 
         snaps = restic_snapshots(tag="obsidian")
         assert len(snaps) == 2
         assert snaps[0].short_id == "abcdef12"
-        assert snaps[0].tags == ["obsidian", "auto-backup"]
-        assert snaps[1].paths == ["/vault"]
+        assert snaps[0].tags == ("obsidian", "auto-backup")
+        assert snaps[1].paths == ("/vault",)
+
+    def test_shares_tag_and_path_tuples(self, mock_subprocess: MagicMock) -> None:
+        snap = {"time": "t", "paths": ["/vault"], "tags": ["obsidian"]}
+        mock_subprocess.return_value.stdout = json.dumps(
+            [{**snap, "id": "a" * 64}, {**snap, "id": "b" * 64}]
+        ).encode()
+        first, second = restic_snapshots(tag="obsidian")
+        assert first.tags is second.tags
+        assert first.paths is second.paths
 
     def test_empty_when_no_repo(self, mock_subprocess: MagicMock) -> None:
         mock_subprocess.return_value.returncode = 1
-        mock_subprocess.return_value.stdout = ""
+        mock_subprocess.return_value.stdout = b""
         assert restic_snapshots() == []
 
     def test_empty_json_array(self, mock_subprocess: MagicMock) -> None:
-        mock_subprocess.return_value.stdout = "[]"
+        mock_subprocess.return_value.stdout = b"[]"
         mock_subprocess.return_value.returncode = 0
         assert restic_snapshots() == []
 
     def test_handles_bad_json(self, mock_subprocess: MagicMock) -> None:
-        mock_subprocess.return_value.stdout = "not json at all"
+        mock_subprocess.return_value.stdout = b"not json at all"
         mock_subprocess.return_value.returncode = 0
         assert restic_snapshots() == []
 
     def test_no_tag_filter(self, mock_subprocess: MagicMock) -> None:
-        mock_subprocess.return_value.stdout = "[]"
+        mock_subprocess.return_value.stdout = b"[]"
         mock_subprocess.return_value.returncode = 0
         restic_snapshots(tag="")
         cmd = mock_subprocess.call_args[0][0]
@@ -302,22 +476,81 @@ class TestResticSnapshots:
         snapshots_json = json.dumps([
             {"id": "abcdef1234567890", "time": "2025-01-15T00:00:00Z", "paths": [], "tags": []},
         ])
-        mock_subprocess.return_value.stdout = snapshots_json
+        mock_subprocess.return_value.stdout = snapshots_json.encode()
         mock_subprocess.return_value.returncode = 0
         snaps = restic_snapshots()
         assert snaps[0].short_id == "abcdef12"
 
 
+class TestSnapshotCache:
+    _SNAPS = json.dumps(
+        [
+            {"id": "a" * 64, "short_id": "aaaaaaaa", "time": "t", "tags": ["obsidian"]},
+            {"id": "b" * 64, "short_id": "bbbbbbbb", "time": "t", "tags": ["manual"]},
+        ]
+    ).encode()
+
+    def test_repeat_listing_is_cached(self, mock_subprocess: MagicMock) -> None:
+        mock_subprocess.return_value.stdout = self._SNAPS
+        first = restic_snapshots(tag="")
+        second = restic_snapshots(tag="")
+        assert first == second
+        assert len(first) == 2
+        mock_subprocess.assert_called_once()
+
+    def test_check_primes_cache_for_tagged_listing(self, mock_subprocess: MagicMock) -> None:
+        mock_subprocess.return_value.stdout = self._SNAPS
+        assert check_restic_repository() is True
+        snaps = restic_snapshots(tag="obsidian")
+        assert [s.short_id for s in snaps] == ["aaaaaaaa"]
+        mock_subprocess.assert_called_once()
+        assert "--tag" not in mock_subprocess.call_args[0][0]
+
+    def test_check_reports_unreachable_repo(self, mock_subprocess: MagicMock) -> None:
+        mock_subprocess.return_value.returncode = 1
+        mock_subprocess.return_value.stdout = b""
+        assert check_restic_repository() is False
+
+    def test_invalidate_forces_refetch(self, mock_subprocess: MagicMock) -> None:
+        mock_subprocess.return_value.stdout = self._SNAPS
+        restic_snapshots(tag="")
+        invalidate_restic_cache()
+        restic_snapshots(tag="")
+        assert mock_subprocess.call_count == 2
+
+    def test_expired_cache_is_refetched(
+        self, mock_subprocess: MagicMock, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        mock_subprocess.return_value.stdout = self._SNAPS
+        restic_snapshots(tag="")
+        monkeypatch.setattr("vault_backup.restore._SNAPSHOT_CACHE_TTL", 0.0)
+        restic_snapshots(tag="")
+        assert mock_subprocess.call_count == 2
+
+
+class TestResticLatestSnapshotIds:
+    def test_returns_ids(self, mock_subprocess: MagicMock) -> None:
+        mock_subprocess.return_value.stdout = json.dumps([{"id": "a" * 64}]).encode()
+        assert restic_latest_snapshot_ids() == {"a" * 64}
+        cmd = mock_subprocess.call_args[0][0]
+        assert cmd[cmd.index("--latest") + 1] == "1"
+
+    def test_none_on_failure(self, mock_subprocess: MagicMock) -> None:
+        mock_subprocess.return_value.returncode = 1
+        mock_subprocess.return_value.stdout = b""
+        assert restic_latest_snapshot_ids() is None
+
+
 class TestResticLs:
-    def test_parses_ndjson_output(self, mock_subprocess: MagicMock) -> None:
+    def test_parses_ndjson_output(self, mock_popen: MagicMock) -> None:
         # restic ls --json outputs one JSON object per line (NDJSON)
         lines = [
             json.dumps({"struct_type": "snapshot", "id": "abc123"}),
             json.dumps({"path": "/vault/notes", "type": "dir", "size": 0, "mtime": "2025-01-15T00:00:00Z"}),
             json.dumps({"path": "/vault/notes/daily.md", "type": "file", "size": 2048, "mtime": "2025-01-15T10:30:00Z"}),
         ]
-        mock_subprocess.return_value.stdout = "\n".join(lines)
-        mock_subprocess.return_value.returncode = 0
+        mock_popen.return_value.stdout = io.BytesIO("\n".join(lines).encode())
+        mock_popen.return_value.returncode = 0
 
         entries = restic_ls("abcdef12")
         assert len(entries) == 2  # snapshot metadata line is skipped
@@ -325,32 +558,40 @@ class TestResticLs:
         assert entries[1].path == "/vault/notes/daily.md"
         assert entries[1].size == 2048
 
-    def test_filters_by_path_prefix(self, mock_subprocess: MagicMock) -> None:
+    def test_path_filtering_left_to_restic(self, mock_popen: MagicMock) -> None:
         lines = [
             json.dumps({"path": "/vault/notes/daily.md", "type": "file", "size": 100, "mtime": ""}),
-            json.dumps({"path": "/vault/templates/t.md", "type": "file", "size": 50, "mtime": ""}),
+            json.dumps({"path": "/vault/notes/sub/t.md", "type": "file", "size": 50, "mtime": ""}),
         ]
-        mock_subprocess.return_value.stdout = "\n".join(lines)
-        mock_subprocess.return_value.returncode = 0
+        mock_popen.return_value.stdout = io.BytesIO("\n".join(lines).encode())
+        mock_popen.return_value.returncode = 0
 
         entries = restic_ls("abcdef12", path="/vault/notes")
-        assert len(entries) == 1
-        assert entries[0].path == "/vault/notes/daily.md"
+        assert [e.path for e in entries] == ["/vault/notes/daily.md", "/vault/notes/sub/t.md"]
 
-    def test_raises_on_bad_snapshot(self, mock_subprocess: MagicMock) -> None:
-        mock_subprocess.return_value.returncode = 1
-        mock_subprocess.return_value.stderr = "snapshot not found"
+    def test_passes_path_to_restic(self, mock_popen: MagicMock) -> None:
+        restic_ls("abcdef12", path="/vault/notes/")
+        cmd = mock_popen.call_args[0][0]
+        assert cmd == ["restic", "ls", "--json", "abcdef12", "--recursive", "/vault/notes"]
+
+    def test_root_lists_whole_snapshot(self, mock_popen: MagicMock) -> None:
+        restic_ls("abcdef12")
+        cmd = mock_popen.call_args[0][0]
+        assert cmd == ["restic", "ls", "--json", "abcdef12"]
+
+    def test_raises_on_bad_snapshot(self, mock_popen: MagicMock) -> None:
+        mock_popen.return_value.returncode = 1
         with pytest.raises(ValueError, match="not found"):
             restic_ls("badid123")
 
-    def test_skips_malformed_json_lines(self, mock_subprocess: MagicMock) -> None:
+    def test_skips_malformed_json_lines(self, mock_popen: MagicMock) -> None:
         lines = [
             json.dumps({"path": "/vault/good.md", "type": "file", "size": 100, "mtime": ""}),
             "this is not json",
             json.dumps({"path": "/vault/also-good.md", "type": "file", "size": 50, "mtime": ""}),
         ]
-        mock_subprocess.return_value.stdout = "\n".join(lines)
-        mock_subprocess.return_value.returncode = 0
+        mock_popen.return_value.stdout = io.BytesIO("\n".join(lines).encode())
+        mock_popen.return_value.returncode = 0
         entries = restic_ls("abcdef12")
         assert len(entries) == 2
 
@@ -370,8 +611,7 @@ class TestResticShowFile:
 
 class TestResticRestoreFile:
     def test_dumps_to_target(self, mock_subprocess: MagicMock, tmp_path: Path) -> None:
-        mock_subprocess.return_value.stdout = "# Restored from restic\n"
-        mock_subprocess.return_value.returncode = 0
+        mock_subprocess.side_effect = _stdout_writer(b"# Restored from restic\n")
         target = tmp_path / "restored.md"
         result = restic_restore_file("abcdef12", "/vault/note.md", target)
         assert result == target
@@ -473,3 +713,15 @@ class TestDetectSource:
 
     def test_12_char_hex_is_git(self) -> None:
         assert detect_source("abcdef123456") == "git"
+
+    def test_full_restic_id_is_restic(self) -> None:
+        assert detect_source("a" * 64) == "restic"
+
+    def test_too_short_hex_is_restic(self) -> None:
+        assert detect_source("abc12") == "restic"
+
+    def test_upper_case_hex_is_git(self) -> None:
+        assert detect_source("ABC1234") == "git"
+
+    def test_trailing_newline_is_not_hex(self) -> None:
+        assert detect_source("abc1234\n") == "restic"
@@ -3,48 +3,86 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import io
+import logging
+import sys
+import threading
+from collections.abc import Callable
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock
 
 import pytest
+from helpers import files_args, log_args, raising, restore_args, show_args, snap_args, swap
 
+from vault_backup import restore, restore_cli
 from vault_backup.restore import GitCommit, ResticEntry, ResticSnapshot
 from vault_backup.restore_cli import (
-    _format_time,
+    _files_table_rows,
+    _render_log_table,
+    _render_snapshots_table,
     _vault_path,
-    build_parser,
+    _write_rows,
     cmd_files,
     cmd_log,
+    cmd_repl,
     cmd_restore,
     cmd_show,
     cmd_snapshots,
     main,
 )
 
-# --- _format_time ---
 
+@pytest.fixture(scope="session")
+def shared_vault(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """An empty vault directory, created once for tests that never write to it."""
+    return tmp_path_factory.mktemp("vault_env", numbered=False)
 
-class TestFormatTime:
-    def test_iso_with_timezone(self) -> None:
-        assert _format_time("2025-01-15T10:30:00+00:00") == "2025-01-15 10:30"
 
-    def test_iso_with_z_suffix(self) -> None:
-        assert _format_time("2025-01-15T10:30:00Z") == "2025-01-15 10:30"
+@pytest.fixture()
+def vault_env(shared_vault: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point VAULT_PATH at the shared, read-only vault and return it."""
+    monkeypatch.setenv("VAULT_PATH", str(shared_vault))
+    return shared_vault
 
-    def test_invalid_returns_original(self) -> None:
-        assert _format_time("not-a-date") == "not-a-date"
 
-    def test_empty_string_returns_empty(self) -> None:
-        assert _format_time("") == ""
+@pytest.fixture()
+def own_vault(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point VAULT_PATH at this test's tmp_path, for tests that write to the vault."""
+    monkeypatch.setenv("VAULT_PATH", str(tmp_path))
+    return tmp_path
+
+
+# --- _write_rows ---
+
+
+class TestWriteRows:
+    def test_writes_all_rows_across_batches(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        monkeypatch.setattr("vault_backup.restore_cli._ROW_BATCH", 2)
+        _write_rows(str(i) for i in range(5))
+        assert capsys.readouterr().out == "0\n1\n2\n3\n4\n"
+
+    def test_keeps_order_with_printed_text(self, capsys: pytest.CaptureFixture[str]) -> None:
+        print("before")
+        _write_rows(["row"])
+        print("after")
+        assert capsys.readouterr().out == "before\nrow\nafter\n"
+
+    def test_text_only_stdout(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        out = io.StringIO()
+        monkeypatch.setattr("sys.stdout", out)
+        _write_rows(["a", "b"])
+        assert out.getvalue() == "a\nb\n"
 
 
 # --- _vault_path ---
 
 
 class TestVaultPath:
-    def test_reads_from_env(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
-        assert _vault_path() == tmp_path
+    def test_reads_from_env(self, vault_env: Path) -> None:
+        assert _vault_path() == vault_env
 
     def test_exits_when_path_missing(self, monkeypatch: pytest.MonkeyPatch) -> None:
         monkeypatch.setenv("VAULT_PATH", "/nonexistent/path/abc123")
@@ -64,45 +102,42 @@ class TestVaultPath:
 
 
 class TestBuildParser:
-    def test_snapshots_subcommand(self) -> None:
-        parser = build_parser()
-        args = parser.parse_args(["snapshots"])
+    def test_snapshots_subcommand(self, parse: Callable[..., argparse.Namespace]) -> None:
+        args = parse("snapshots")
         assert args.command == "snapshots"
         assert args.tag == "obsidian"
 
-    def test_snapshots_custom_tag(self) -> None:
-        parser = build_parser()
-        args = parser.parse_args(["snapshots", "--tag", "daily"])
+    def test_snapshots_custom_tag(self, parse: Callable[..., argparse.Namespace]) -> None:
+        args = parse("snapshots", "--tag", "daily")
         assert args.tag == "daily"
 
-    def test_files_subcommand(self) -> None:
-        parser = build_parser()
-        args = parser.parse_args(["files", "abc12345"])
+    def test_files_subcommand(self, parse: Callable[..., argparse.Namespace]) -> None:
+        args = parse("files", "abc12345")
         assert args.snapshot_id == "abc12345"
         assert args.path == "/"
 
-    def test_log_subcommand(self) -> None:
-        parser = build_parser()
-        args = parser.parse_args(["log", "--file", "notes/daily.md", "--count", "5"])
+    def test_log_subcommand(self, parse: Callable[..., argparse.Namespace]) -> None:
+        args = parse("log", "--file", "notes/daily.md", "--count", "5")
         assert args.file == "notes/daily.md"
         assert args.count == 5
 
-    def test_show_subcommand(self) -> None:
-        parser = build_parser()
-        args = parser.parse_args(["show", "abc123d", "notes/daily.md"])
+    def test_show_subcommand(self, parse: Callable[..., argparse.Namespace]) -> None:
+        args = parse("show", "abc123d", "notes/daily.md")
         assert args.commit == "abc123d"
         assert args.path == "notes/daily.md"
 
-    def test_restore_subcommand(self) -> None:
-        parser = build_parser()
-        args = parser.parse_args(["restore", "abc123d", "notes/daily.md", "-o", "out.md"])
+    def test_restore_subcommand(self, parse: Callable[..., argparse.Namespace]) -> None:
+        args = parse("restore", "abc123d", "notes/daily.md", "-o", "out.md")
         assert args.source == "abc123d"
         assert args.path == "notes/daily.md"
         assert args.output == "out.md"
 
-    def test_restore_default_output(self) -> None:
-        parser = build_parser()
-        args = parser.parse_args(["restore", "abc123d", "notes/daily.md"])
+    def test_restore_prefer_flag(self, parse: Callable[..., argparse.Namespace]) -> None:
+        assert parse("restore", "abcdef12", "n.md").prefer == "git"
+        assert parse("restore", "abcdef12", "n.md", "--prefer", "restic").prefer == "restic"
+
+    def test_restore_default_output(self, parse: Callable[..., argparse.Namespace]) -> None:
+        args = parse("restore", "abc123d", "notes/daily.md")
         assert args.output is None
 
 
@@ -111,237 +146,502 @@ class TestBuildParser:
 
 class TestMain:
     def test_no_subcommand_exits(self) -> None:
-        with patch("sys.argv", ["vault-backup-restore"]), pytest.raises(SystemExit, match="1"):
+        with swap(sys, "argv", ["vault-backup-restore"]), pytest.raises(SystemExit, match="1"):
             main()
 
-    def test_verbose_sets_debug(self) -> None:
+    def test_no_subcommand_prints_usage(self, capsys: pytest.CaptureFixture[str]) -> None:
+        with swap(sys, "argv", ["vault-backup-restore"]), pytest.raises(SystemExit):
+            main()
+        assert "usage: vault-backup-restore" in capsys.readouterr().out
+
+    def test_flags_without_subcommand_print_help(self, capsys: pytest.CaptureFixture[str]) -> None:
         with (
-            patch("sys.argv", ["vault-backup-restore", "-v", "snapshots"]),
-            patch("vault_backup.restore_cli.restic_snapshots", return_value=[]),
+            swap(sys, "argv", ["vault-backup-restore", "-v"]),
+            pytest.raises(SystemExit, match="1"),
         ):
             main()
-            import logging
+        assert "Browse and restore files" in capsys.readouterr().out
 
-            assert logging.getLogger().level == logging.DEBUG
+    def test_version(self, capsys: pytest.CaptureFixture[str]) -> None:
+        from vault_backup import __version__
+
+        with swap(sys, "argv", ["vault-backup-restore", "--version"]):
+            main()
+        assert capsys.readouterr().out == f"vault-backup-restore {__version__}\n"
+
+    def test_logging_left_alone_without_verbose(self) -> None:
+        with (
+            swap(sys, "argv", ["vault-backup-restore", "snapshots", "--no-cache"]),
+            swap(restore, "restic_snapshots", lambda *_a, **_k: []),
+            swap(restore_cli, "_configure_logging", MagicMock()) as mock_configure,
+        ):
+            main()
+            mock_configure.assert_not_called()
+
+    def test_verbose_sets_debug(self) -> None:
+        with (
+            swap(sys, "argv", ["vault-backup-restore", "-v", "snapshots"]),
+            swap(restore, "restic_snapshots", lambda *_a, **_k: []),
+        ):
+            main()
+        assert logging.getLogger().level == logging.DEBUG
 
 
 # --- cmd_snapshots ---
 
 
 class TestCmdSnapshots:
-    def test_prints_table(self, capsys: pytest.CaptureFixture[str]) -> None:
-        snaps = [
-            ResticSnapshot(
-                id="a" * 64, short_id="abcdef12",
-                time="2025-01-15T10:30:00Z", paths=["/vault"], tags=["obsidian"],
-            ),
-        ]
-        with patch("vault_backup.restore_cli.restic_snapshots", return_value=snaps):
-            args = argparse.Namespace(tag="obsidian")
-            cmd_snapshots(args)
-
-        out = capsys.readouterr().out
-        assert "abcdef12" in out
-        assert "2025-01-15 10:30" in out
-        assert "/vault" in out
-        assert "obsidian" in out
+    def test_renders_table(self, sample_snapshot: ResticSnapshot) -> None:
+        table = _render_snapshots_table([sample_snapshot])
+        assert "abcdef12" in table
+        assert "2025-01-15 10:30" in table
+        assert "/vault" in table
+        assert "obsidian" in table
 
     def test_empty_snapshots(self, capsys: pytest.CaptureFixture[str]) -> None:
-        with patch("vault_backup.restore_cli.restic_snapshots", return_value=[]):
-            cmd_snapshots(argparse.Namespace(tag="obsidian"))
+        with swap(restore, "restic_snapshots", lambda *_a, **_k: []):
+            cmd_snapshots(snap_args())
         assert "No snapshots found." in capsys.readouterr().out
 
 
+class TestSnapshotDiskCache:
+    _SNAPS = [
+        ResticSnapshot(
+            id="a" * 64,
+            short_id="abcdef12",
+            time="2025-01-15T10:30:00Z",
+            paths=("/vault",),
+            tags=("obsidian",),
+        ),
+    ]
+
+    @pytest.fixture(autouse=True)
+    def _cache_env(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        monkeypatch.setenv("RESTIC_REPOSITORY", "s3:example/bucket")
+
+    def _prime(self) -> None:
+        with swap(restore, "restic_snapshots", lambda *_a, **_k: self._SNAPS):
+            cmd_snapshots(snap_args())
+
+    def test_reuses_listing_when_no_new_snapshots(self, capsys: pytest.CaptureFixture[str]) -> None:
+        self._prime()
+        capsys.readouterr()
+        with (
+            swap(restore, "restic_latest_snapshot_ids", lambda *_a, **_k: {"a" * 64}),
+            swap(restore, "restic_snapshots", MagicMock()) as mock_snaps,
+        ):
+            cmd_snapshots(snap_args())
+            mock_snaps.assert_not_called()
+        assert "abcdef12" in capsys.readouterr().out
+
+    def test_new_snapshot_refetches(self) -> None:
+        self._prime()
+        with (
+            swap(restore, "restic_latest_snapshot_ids", lambda *_a, **_k: {"b" * 64}),
+            swap(restore, "restic_snapshots", MagicMock(return_value=self._SNAPS)) as mock_snaps,
+        ):
+            cmd_snapshots(snap_args())
+            mock_snaps.assert_called_once()
+
+    def test_no_cache_flag_skips_cache(self) -> None:
+        self._prime()
+        with (
+            swap(restore, "restic_latest_snapshot_ids", MagicMock()) as mock_latest,
+            swap(restore, "restic_snapshots", MagicMock(return_value=self._SNAPS)) as mock_snaps,
+        ):
+            cmd_snapshots(snap_args(no_cache=True))
+            mock_latest.assert_not_called()
+            mock_snaps.assert_called_once()
+
+
 # --- cmd_files ---
 
 
 class TestCmdFiles:
-    def test_prints_file_table(self, capsys: pytest.CaptureFixture[str]) -> None:
-        entries = [
-            ResticEntry(path="/vault/note.md", type="file", size=2048, mtime="2025-01-15T10:30:00Z"),
-            ResticEntry(path="/vault/dir", type="dir", size=0, mtime="2025-01-15T00:00:00Z"),
-        ]
-        with patch("vault_backup.restore_cli.restic_ls", return_value=entries):
-            cmd_files(argparse.Namespace(snapshot_id="abcdef12", path="/"))
-
-        out = capsys.readouterr().out
-        assert "2,048" in out  # formatted size
-        assert "/vault/note.md" in out
-        assert "-" in out  # dir size shows dash
+    def test_renders_file_table(
+        self, sample_entry_file: ResticEntry, sample_entry_dir: ResticEntry
+    ) -> None:
+        _, _, file_row, dir_row = _files_table_rows([sample_entry_file, sample_entry_dir])
+        assert "2,048" in file_row  # formatted size
+        assert "/vault/note.md" in file_row
+        assert dir_row.split()[1] == "-"  # dir size shows dash
 
     def test_empty_files(self, capsys: pytest.CaptureFixture[str]) -> None:
-        with patch("vault_backup.restore_cli.restic_ls", return_value=[]):
-            cmd_files(argparse.Namespace(snapshot_id="abcdef12", path="/"))
+        with swap(restore, "iter_restic_ls", lambda *_a, **_k: []):
+            cmd_files(files_args())
         assert "No files found." in capsys.readouterr().out
 
     def test_bad_snapshot_exits(self, capsys: pytest.CaptureFixture[str]) -> None:
         with (
-            patch("vault_backup.restore_cli.restic_ls", side_effect=ValueError("not found")),
+            swap(restore, "iter_restic_ls", raising(ValueError("not found"))),
             pytest.raises(SystemExit, match="1"),
         ):
-            cmd_files(argparse.Namespace(snapshot_id="bad", path="/"))
+            cmd_files(files_args("bad"))
         assert "not found" in capsys.readouterr().err
 
+    def test_rows_printed_before_late_error(self, capsys: pytest.CaptureFixture[str]) -> None:
+        def entries():
+            yield ResticEntry(path="/vault/note.md", type="file", size=1, mtime="")
+            raise ValueError("not found")
+
+        with (
+            swap(restore, "iter_restic_ls", lambda *_a, **_k: entries()),
+            pytest.raises(SystemExit, match="1"),
+        ):
+            cmd_files(files_args())
+        captured = capsys.readouterr()
+        assert "/vault/note.md" in captured.out
+        assert "not found" in captured.err
+
 
 # --- cmd_log ---
 
 
+@pytest.mark.usefixtures("vault_env")
 class TestCmdLog:
-    def test_prints_commit_table(
-        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
-    ) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
-        commits = [
-            GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="update notes"),
-        ]
-        with patch("vault_backup.restore_cli.git_log", return_value=commits):
-            cmd_log(argparse.Namespace(file=None, count=20))
+    def test_renders_commit_table(self, sample_commit: GitCommit) -> None:
+        table = _render_log_table([sample_commit])
+        assert "abc123d" in table
+        assert "update notes" in table
 
-        out = capsys.readouterr().out
-        assert "abc123d" in out
-        assert "update notes" in out
-
-    def test_with_file_filter(
-        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
-    ) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
+    def test_with_file_filter(self, vault_env: Path) -> None:
         commits = [
-            GitCommit(hash="b" * 40, short_hash="bbb1234", date="2025-01-14T09:00:00+00:00", message="edit daily"),
+            GitCommit(
+                hash="b" * 40,
+                short_hash="bbb1234",
+                date="2025-01-14T09:00:00+00:00",
+                message="edit daily",
+            ),
         ]
-        with patch("vault_backup.restore_cli.git_file_history", return_value=commits) as mock_hist:
-            cmd_log(argparse.Namespace(file="notes/daily.md", count=10))
-            mock_hist.assert_called_once_with(tmp_path, "notes/daily.md", count=10)
+        with swap(restore, "git_file_history", MagicMock(return_value=commits)) as mock_hist:
+            cmd_log(log_args("notes/daily.md", count=10))
+            mock_hist.assert_called_once_with(vault_env, "notes/daily.md", count=10)
 
-    def test_empty_log(
-        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
-    ) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
-        with patch("vault_backup.restore_cli.git_log", return_value=[]):
-            cmd_log(argparse.Namespace(file=None, count=20))
+    def test_empty_log(self, capsys: pytest.CaptureFixture[str]) -> None:
+        with swap(restore, "git_log", lambda *_a, **_k: []):
+            cmd_log(log_args())
         assert "No commits found." in capsys.readouterr().out
 
 
+@pytest.mark.usefixtures("vault_env")
+class TestLogDiskCache:
+    _COMMITS = [
+        GitCommit(
+            hash="a" * 40,
+            short_hash="abc123d",
+            date="2025-01-15T10:30:00+00:00",
+            message="update notes",
+        ),
+    ]
+
+    @pytest.fixture(autouse=True)
+    def _cache_env(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+    def _run(self, head: str) -> MagicMock:
+        with (
+            swap(restore, "git_head", lambda *_a, **_k: head),
+            swap(restore, "git_log", MagicMock(return_value=self._COMMITS)) as mock_log,
+        ):
+            cmd_log(log_args())
+        return mock_log
+
+    def test_same_head_reuses_listing(self, capsys: pytest.CaptureFixture[str]) -> None:
+        self._run("1" * 40)
+        capsys.readouterr()
+        assert self._run("1" * 40).call_count == 0
+        assert "update notes" in capsys.readouterr().out
+
+    def test_moved_head_reruns_git_log(self) -> None:
+        self._run("1" * 40)
+        assert self._run("2" * 40).call_count == 1
+
+    def test_no_cache_flag_skips_cache(self) -> None:
+        with (
+            swap(restore, "git_head", MagicMock()) as mock_head,
+            swap(restore_cli, "_cache_path", MagicMock()) as mock_cache_path,
+            swap(restore, "git_log", MagicMock(return_value=self._COMMITS)) as mock_log,
+        ):
+            cmd_log(log_args(no_cache=True))
+        mock_head.assert_not_called()
+        mock_cache_path.assert_not_called()
+        mock_log.assert_called_once()
+
+
 # --- cmd_show ---
 
 
+@pytest.mark.usefixtures("vault_env")
 class TestCmdShow:
-    def test_prints_content(
-        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
-    ) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
-        with patch("vault_backup.restore_cli.git_show_file", return_value="# Hello\n"):
-            cmd_show(argparse.Namespace(commit="abc123d", path="note.md"))
+    def test_prints_content(self, capsys: pytest.CaptureFixture[str]) -> None:
+        with swap(restore, "git_show_file", lambda *_a, **_k: "# Hello\n"):
+            cmd_show(show_args())
         assert capsys.readouterr().out == "# Hello\n"
 
-    def test_missing_file_exits(
-        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
-    ) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
+    def test_missing_file_exits(self, capsys: pytest.CaptureFixture[str]) -> None:
         with (
-            patch("vault_backup.restore_cli.git_show_file", side_effect=FileNotFoundError("not found")),
+            swap(restore, "git_show_file", raising(FileNotFoundError("not found"))),
             pytest.raises(SystemExit, match="1"),
         ):
-            cmd_show(argparse.Namespace(commit="abc123d", path="gone.md"))
+            cmd_show(show_args(path="gone.md"))
         assert "not found" in capsys.readouterr().err
 
 
 # --- cmd_restore ---
 
 
-class TestCmdRestore:
-    def test_git_restore(
-        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
-    ) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
-        target = tmp_path / "out.md"
-        with patch("vault_backup.restore_cli.git_restore_file", return_value=target):
-            cmd_restore(argparse.Namespace(
-                source="a" * 40, path="notes/daily.md", output=str(target),
-            ))
-        assert "git commit" in capsys.readouterr().out
-
-    def test_restic_restore(self, capsys: pytest.CaptureFixture[str], tmp_path: Path) -> None:
-        target = tmp_path / "out.md"
-        with patch("vault_backup.restore_cli.restic_restore_file", return_value=target):
-            cmd_restore(argparse.Namespace(
-                source="latest", path="/vault/note.md", output=str(target),
-            ))
-        assert "restic snapshot" in capsys.readouterr().out
+# Outcome of a swapped-in restore function: write the output, raise, or never be called
+_WRITES = "writes"
+_NOT_CALLED = None
 
-    def test_ambiguous_tries_git_first(
-        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
-    ) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
-        target = tmp_path / "out.md"
-        with patch("vault_backup.restore_cli.git_restore_file", return_value=target) as mock_git:
-            cmd_restore(argparse.Namespace(
-                source="abcdef12", path="note.md", output=str(target),
-            ))
-            mock_git.assert_called_once()
-        assert "git commit" in capsys.readouterr().out
 
-    def test_ambiguous_falls_back_to_restic(
-        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+def _restore_stand_in(
+    outcome: str | BaseException | type[BaseException] | None, output: Path
+) -> Callable[..., Path]:
+    """Build a restore function stand-in for one of the outcomes above."""
+    if outcome is _NOT_CALLED:
+        return raising(AssertionError("unexpected restore call"))
+    if isinstance(outcome, str):
+        return lambda *_a, **_k: output
+    return raising(outcome)
+
+
+class TestCmdRestore:
+    @pytest.mark.parametrize(
+        ("source", "repo", "prefer", "git", "restic", "out", "err"),
+        [
+            pytest.param(
+                "a" * 40,
+                False,
+                "git",
+                _WRITES,
+                _NOT_CALLED,
+                "git commit",
+                None,
+                id="git",
+            ),
+            pytest.param(
+                "latest",
+                False,
+                "git",
+                _NOT_CALLED,
+                _WRITES,
+                "restic snapshot",
+                None,
+                id="restic",
+            ),
+            pytest.param(
+                "abcdef12",
+                True,
+                "git",
+                _WRITES,
+                FileNotFoundError,
+                "git commit",
+                None,
+                id="ambiguous-tries-git-first",
+            ),
+            pytest.param(
+                "abcdef12",
+                True,
+                "restic",
+                _WRITES,
+                _WRITES,
+                "restic snapshot",
+                None,
+                id="ambiguous-prefer-restic",
+            ),
+            pytest.param(
+                "abcdef12",
+                True,
+                "restic",
+                _WRITES,
+                FileNotFoundError,
+                "git commit",
+                None,
+                id="ambiguous-prefer-restic-falls-back-to-git",
+            ),
+            pytest.param(
+                "abcdef12",
+                True,
+                "git",
+                FileNotFoundError,
+                FileNotFoundError,
+                None,
+                "not found in git commit or restic snapshot",
+                id="ambiguous-both-fail",
+            ),
+            pytest.param(
+                "a" * 40,
+                False,
+                "git",
+                FileNotFoundError("nope"),
+                _NOT_CALLED,
+                None,
+                "nope",
+                id="git-failure",
+            ),
+            pytest.param(
+                "latest",
+                False,
+                "git",
+                _NOT_CALLED,
+                FileNotFoundError("nope"),
+                None,
+                "nope",
+                id="restic-failure",
+            ),
+        ],
+    )
+    def test_restore_source(
+        self,
+        request: pytest.FixtureRequest,
+        capsys: pytest.CaptureFixture[str],
+        source: str,
+        repo: bool,
+        prefer: str,
+        git: str | BaseException | type[BaseException] | None,
+        restic: str | BaseException | type[BaseException] | None,
+        out: str | None,
+        err: str | None,
     ) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
-        target = tmp_path / "out.md"
+        vault: Path = request.getfixturevalue("own_vault" if repo else "vault_env")
+        if repo:
+            (vault / ".git").mkdir()
+            output = vault / "out.md"
+        else:
+            output = Path("out.md")  # never written: both restore functions are stand-ins
         with (
-            patch("vault_backup.restore_cli.git_restore_file", side_effect=FileNotFoundError),
-            patch("vault_backup.restore_cli.restic_restore_file", return_value=target),
+            swap(restore, "git_restore_file", _restore_stand_in(git, output)),
+            swap(restore, "restic_restore_file", _restore_stand_in(restic, output)),
+            pytest.raises(SystemExit, match="1") if err else contextlib.nullcontext(),
         ):
-            cmd_restore(argparse.Namespace(
-                source="abcdef12", path="note.md", output=str(target),
-            ))
-        assert "restic snapshot" in capsys.readouterr().out
+            cmd_restore(restore_args(source, "note.md", output, prefer=prefer))
+        captured = capsys.readouterr()
+        if out:
+            assert out in captured.out
+        if err:
+            assert err in captured.err
+
+    def test_ambiguous_git_hit_cancels_restic(self, own_vault: Path) -> None:
+        (own_vault / ".git").mkdir()
+        target = own_vault / "out.md"
+        cancelled = []
+
+        def slow_restic(*_args: object, cancel: threading.Event | None) -> Path:
+            assert cancel is not None
+            cancelled.append(cancel.wait(timeout=5))
+            raise FileNotFoundError
 
-    def test_ambiguous_both_fail_exits(
-        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
-    ) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
         with (
-            patch("vault_backup.restore_cli.git_restore_file", side_effect=FileNotFoundError),
-            patch("vault_backup.restore_cli.restic_restore_file", side_effect=FileNotFoundError),
-            pytest.raises(SystemExit, match="1"),
+            swap(restore, "git_restore_file", lambda *_a, **_k: target),
+            swap(restore, "restic_restore_file", slow_restic),
         ):
-            cmd_restore(argparse.Namespace(
-                source="abcdef12", path="note.md", output=str(tmp_path / "out.md"),
-            ))
-        assert "not found in git commit or restic snapshot" in capsys.readouterr().err
+            cmd_restore(restore_args("abcdef12", "note.md", target))
+        assert cancelled == [True]
+        assert [p.name for p in own_vault.iterdir()] == [".git"]
+
+    def test_ambiguous_git_error_cancels_restic(self, own_vault: Path) -> None:
+        (own_vault / ".git").mkdir()
+        target = own_vault / "out.md"
+        cancelled = []
+
+        def slow_restic(
+            _snapshot_id: str, _filepath: str, scratch: Path, *, cancel: threading.Event | None
+        ) -> Path:
+            scratch.write_text("partial")
+            assert cancel is not None
+            cancelled.append(cancel.wait(timeout=5))
+            raise FileNotFoundError
 
-    def test_git_restore_failure_exits(
-        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
-    ) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
         with (
-            patch("vault_backup.restore_cli.git_restore_file", side_effect=FileNotFoundError("nope")),
-            pytest.raises(SystemExit, match="1"),
+            swap(restore, "git_restore_file", raising(PermissionError("read-only"))),
+            swap(restore, "restic_restore_file", slow_restic),
+            pytest.raises(PermissionError),
         ):
-            cmd_restore(argparse.Namespace(
-                source="a" * 40, path="gone.md", output=str(tmp_path / "out.md"),
-            ))
-        assert "nope" in capsys.readouterr().err
+            cmd_restore(restore_args("abcdef12", "note.md", target))
+        assert cancelled == [True]
+        assert [p.name for p in own_vault.iterdir()] == [".git"]
 
-    def test_restic_restore_failure_exits(
-        self, capsys: pytest.CaptureFixture[str], tmp_path: Path
+    def test_ambiguous_falls_back_to_restic(
+        self, own_vault: Path, capsys: pytest.CaptureFixture[str]
     ) -> None:
+        (own_vault / ".git").mkdir()
+        target = own_vault / "out.md"
+
+        def restic_dump(_snapshot_id: str, _filepath: str, scratch: Path, **_kwargs) -> Path:
+            scratch.write_text("# from restic\n")
+            return scratch
+
         with (
-            patch("vault_backup.restore_cli.restic_restore_file", side_effect=FileNotFoundError("nope")),
-            pytest.raises(SystemExit, match="1"),
+            swap(restore, "git_restore_file", raising(FileNotFoundError)),
+            swap(restore, "restic_restore_file", restic_dump),
         ):
-            cmd_restore(argparse.Namespace(
-                source="latest", path="/vault/gone.md", output=str(tmp_path / "out.md"),
-            ))
-        assert "nope" in capsys.readouterr().err
+            cmd_restore(restore_args("abcdef12", "note.md", target))
+        assert "restic snapshot" in capsys.readouterr().out
+        assert target.read_text() == "# from restic\n"
+        assert sorted(p.name for p in own_vault.iterdir()) == [".git", "out.md"]
 
-    def test_default_output_uses_filename(
-        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
-    ) -> None:
-        monkeypatch.setenv("VAULT_PATH", str(tmp_path))
-        with patch("vault_backup.restore_cli.git_restore_file") as mock_restore:
+    @pytest.mark.usefixtures("vault_env")
+    def test_ambiguous_without_repo_skips_git(self, capsys: pytest.CaptureFixture[str]) -> None:
+        target = Path("out.md")
+        with (
+            swap(restore, "git_restore_file", MagicMock()) as mock_git,
+            swap(restore, "restic_restore_file", MagicMock(return_value=target)) as mock_restic,
+        ):
+            cmd_restore(restore_args("abcdef12", "note.md", target))
+            mock_git.assert_not_called()
+            mock_restic.assert_called_once_with("abcdef12", "note.md", target)
+        assert "restic snapshot" in capsys.readouterr().out
+
+    @pytest.mark.usefixtures("vault_env")
+    def test_default_output_uses_filename(self) -> None:
+        with swap(restore, "git_restore_file", MagicMock()) as mock_restore:
             mock_restore.return_value = Path("daily.md")
-            cmd_restore(argparse.Namespace(
-                source="a" * 40, path="notes/daily.md", output=None,
-            ))
+            cmd_restore(restore_args("a" * 40, "notes/daily.md"))
             # Output path should be just the filename, not the full vault path
             call_target = mock_restore.call_args[0][3]
             assert call_target == Path("daily.md")
+
+
+# --- cmd_repl ---
+
+
+class TestCmdRepl:
+    @pytest.mark.usefixtures("vault_env")
+    def test_frames_each_reply_with_status(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        monkeypatch.setattr("sys.stdin", io.StringIO("snapshots --no-cache\nbogus\n\nrepl\n"))
+        with swap(restore, "restic_snapshots", lambda *_a, **_k: []):
+            cmd_repl(argparse.Namespace())
+        assert capsys.readouterr().out.endswith("No snapshots found.\n\x1e0\n\x1e2\n\x1e0\n\x1e2\n")
+
+    @pytest.mark.usefixtures("vault_env")
+    def test_failing_command_keeps_session(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        monkeypatch.setattr(
+            "sys.stdin", io.StringIO("snapshots --no-cache\nsnapshots --no-cache\n")
+        )
+        stand_in = MagicMock(side_effect=[RuntimeError("restic exploded"), []])
+        with swap(restore, "restic_snapshots", stand_in):
+            cmd_repl(argparse.Namespace())
+        captured = capsys.readouterr()
+        assert captured.out == "\x1e1\nNo snapshots found.\n\x1e0\n"
+        assert "error: restic exploded" in captured.err
+
+    def test_show_uses_session_batch(
+        self, own_vault: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        (own_vault / ".git").mkdir()
+        monkeypatch.setattr("sys.stdin", io.StringIO("show abc123d a.md\nshow abc123d b.md\n"))
+        with (
+            swap(restore, "GitCatFile", MagicMock()) as mock_batch_cls,
+            swap(restore, "git_show_file", MagicMock(return_value="x\n")) as mock_show,
+        ):
+            cmd_repl(argparse.Namespace())
+        session = mock_batch_cls.return_value.__enter__.return_value
+        mock_batch_cls.assert_called_once_with(own_vault)
+        assert [c.kwargs["batch"] for c in mock_show.call_args_list] == [session, session]
+        assert capsys.readouterr().out == "x\n\x1e0\nx\n\x1e0\n"
@@ -3,23 +3,20 @@
 from __future__ import annotations
 
 import json
-import urllib.error
 import urllib.request
-from http.server import HTTPServer
+from collections.abc import Iterator
+from http.client import HTTPConnection
 from pathlib import Path
-from threading import Thread
-from unittest.mock import patch
+from unittest.mock import MagicMock
 
 import pytest
+from helpers import raising, swap
 
-from vault_backup.config import Config
-from vault_backup.health import HealthState
+from vault_backup import ui
 from vault_backup.restore import GitCommit, GitFileChange, ResticEntry, ResticSnapshot
 from vault_backup.ui import (
-    RestoreHandler,
     _diff_toggle_buttons,
     _format_size,
-    _format_time,
     _render_commit_files,
     _render_diff,
     _render_error,
@@ -31,76 +28,51 @@ from vault_backup.ui import (
     _render_snapshots,
 )
 
+# Every test gets the shared server's health state, freshly installed
+pytestmark = pytest.mark.usefixtures("reset_health_state")
 
-@pytest.fixture()
-def ui_server(default_config: Config):
-    """Start a real HTTP server with RestoreHandler for testing."""
-    import vault_backup.health as health_mod
 
-    health_mod._health_state = HealthState(config=default_config)
-    server = HTTPServer(("127.0.0.1", 0), RestoreHandler)
-    port = server.server_address[1]
-    thread = Thread(target=server.serve_forever, daemon=True)
-    thread.start()
-    yield f"http://127.0.0.1:{port}"
-    server.shutdown()
-    health_mod._health_state = None
+@pytest.fixture(autouse=True)
+def _clear_restic_ls_cache() -> Iterator[None]:
+    """Keep the ``restic ls`` cache from leaking listings between tests."""
+    yield
     _restic_ls_cache.clear()
 
 
-def _get(url: str) -> tuple[int, str, dict[str, str]]:
+def _get(conn: HTTPConnection, path: str) -> tuple[int, str, dict[str, str]]:
     """GET request helper. Returns (status, body, headers)."""
-    try:
-        resp = urllib.request.urlopen(url)
-        return resp.status, resp.read().decode(), dict(resp.headers)
-    except urllib.error.HTTPError as e:
-        return e.code, e.read().decode(), dict(e.headers)
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    return resp.status, resp.read().decode(), dict(resp.getheaders())
 
 
-def _post(url: str, data: str) -> tuple[int, str]:
+def _post(conn: HTTPConnection, path: str, data: str) -> tuple[int, str]:
     """POST request helper. Returns (status, body)."""
-    try:
-        req = urllib.request.Request(
-            url, data=data.encode(), method="POST",
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-        )
-        resp = urllib.request.urlopen(req)
-        return resp.status, resp.read().decode()
-    except urllib.error.HTTPError as e:
-        return e.code, e.read().decode()
+    conn.request(
+        "POST",
+        path,
+        body=data.encode(),
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    resp = conn.getresponse()
+    return resp.status, resp.read().decode()
 
 
 # --- Helpers ---
 
 
-class TestFormatTime:
-    def test_iso_with_z(self) -> None:
-        assert _format_time("2025-01-15T10:30:00Z") == "2025-01-15 10:30"
-
-    def test_iso_with_offset(self) -> None:
-        assert _format_time("2025-01-15T10:30:00+00:00") == "2025-01-15 10:30"
-
-    def test_empty(self) -> None:
-        assert _format_time("") == ""
-
-    def test_invalid(self) -> None:
-        assert _format_time("not-a-date") == "not-a-date"
-
-
 class TestFormatSize:
-    def test_zero(self) -> None:
-        assert _format_size(0) == "-"
-
-    def test_bytes(self) -> None:
-        assert _format_size(512) == "512 B"
-
-    def test_kilobytes(self) -> None:
-        result = _format_size(2048)
-        assert "KB" in result
-
-    def test_megabytes(self) -> None:
-        result = _format_size(5 * 1024 * 1024)
-        assert "MB" in result
+    @pytest.mark.parametrize(
+        ("size", "expected"),
+        [
+            (0, "-"),
+            (512, "512 B"),
+            (2048, "2.0 KB"),
+            (5 * 1024 * 1024, "5.0 MB"),
+        ],
+    )
+    def test_format(self, size: int, expected: str) -> None:
+        assert _format_size(size) == expected
 
 
 # --- Render functions ---
@@ -110,13 +82,8 @@ class TestRenderSnapshots:
     def test_empty(self) -> None:
         assert "No snapshots found" in _render_snapshots([])
 
-    def test_table(self) -> None:
-        snaps = [
-            ResticSnapshot(
-                id="a" * 64, short_id="abcdef12",
-                time="2025-01-15T10:30:00Z", paths=["/vault"], tags=["obsidian"],
-            ),
-        ]
+    def test_table(self, sample_snapshot: ResticSnapshot) -> None:
+        snaps = [sample_snapshot]
         result = _render_snapshots(snaps)
         assert "abcdef12" in result
         assert "/vault" in result
@@ -130,11 +97,10 @@ class TestRenderFiles:
         assert "No files found" in result
         assert "abcdef12" in result
 
-    def test_file_and_dir(self) -> None:
-        entries = [
-            ResticEntry(path="/vault/note.md", type="file", size=2048, mtime="2025-01-15T10:30:00Z"),
-            ResticEntry(path="/vault/dir", type="dir", size=0, mtime=""),
-        ]
+    def test_file_and_dir(
+        self, sample_entry_file: ResticEntry, sample_entry_dir: ResticEntry
+    ) -> None:
+        entries = [sample_entry_file, sample_entry_dir]
         result = _render_files(entries, "abcdef12")
         assert "/vault/note.md" in result
         assert "clickable" in result
@@ -147,20 +113,16 @@ class TestRenderLog:
         assert "No commits found" in result
         assert 'name="file"' in result  # filter input still present
 
-    def test_without_file(self) -> None:
-        commits = [
-            GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="update"),
-        ]
+    def test_without_file(self, sample_commit: GitCommit) -> None:
+        commits = [sample_commit]
         result = _render_log(commits)
         assert "abc123d" in result
         assert "update" in result
         assert "clickable" in result  # all commits are clickable
         assert "/ui/commit?hash=abc123d" in result
 
-    def test_with_file_filter(self) -> None:
-        commits = [
-            GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="edit"),
-        ]
+    def test_with_file_filter(self, sample_commit: GitCommit) -> None:
+        commits = [sample_commit]
         result = _render_log(commits, file_path="notes/daily.md")
         assert "clickable" in result
         assert "notes/daily.md" in result
@@ -201,17 +163,17 @@ class TestRenderRestoreResult:
 
 
 class TestUIPage:
-    def test_returns_html(self, ui_server: str) -> None:
-        status, body, headers = _get(f"{ui_server}/ui")
+    def test_returns_html(self, ui_server: HTTPConnection) -> None:
+        status, body, headers = _get(ui_server, "/ui")
         assert status == 200
         assert "text/html" in headers.get("Content-Type", "")
 
-    def test_contains_htmx(self, ui_server: str) -> None:
-        _, body, _ = _get(f"{ui_server}/ui")
+    def test_contains_htmx(self, ui_server: HTTPConnection) -> None:
+        _, body, _ = _get(ui_server, "/ui")
         assert "htmx" in body
 
-    def test_has_tabs(self, ui_server: str) -> None:
-        _, body, _ = _get(f"{ui_server}/ui")
+    def test_has_tabs(self, ui_server: HTTPConnection) -> None:
+        _, body, _ = _get(ui_server, "/ui")
         assert "Git History" in body
         assert "Snapshots" in body
 
@@ -220,42 +182,69 @@ class TestUIPage:
 
 
 class TestHealthFallthrough:
-    def test_health_still_works(self, ui_server: str) -> None:
-        status, body, _ = _get(f"{ui_server}/health")
+    def test_health_still_works(self, ui_server: HTTPConnection) -> None:
+        status, body, _ = _get(ui_server, "/health")
         assert status == 200
         data = json.loads(body)
         assert data["status"] == "healthy"
 
-    def test_ready_still_works(self, ui_server: str) -> None:
-        status, body, _ = _get(f"{ui_server}/ready")
+    def test_ready_still_works(self, ui_server: HTTPConnection) -> None:
+        status, body, _ = _get(ui_server, "/ready")
         assert status == 200
         data = json.loads(body)
         assert data["ready"] is True
 
-    def test_404_for_unknown(self, ui_server: str) -> None:
-        status, _, _ = _get(f"{ui_server}/nonexistent")
+    def test_404_for_unknown(self, ui_server: HTTPConnection) -> None:
+        status, _, _ = _get(ui_server, "/nonexistent")
         assert status == 404
 
 
+# --- Production handler ---
+
+
+class TestProductionHandler:
+    """The endpoint tests above use an HTTP/1.1 subclass; these hit RestoreHandler as shipped."""
+
+    def test_ui_page_over_http_10(self, restore_handler_url: str) -> None:
+        with urllib.request.urlopen(f"{restore_handler_url}/ui", timeout=10) as resp:
+            assert resp.status == 200
+            assert resp.version == 10
+            assert "htmx" in resp.read().decode()
+
+    def test_health(self, restore_handler_url: str) -> None:
+        with urllib.request.urlopen(f"{restore_handler_url}/health", timeout=10) as resp:
+            assert json.loads(resp.read())["status"] == "healthy"
+
+    def test_restore_post(self, restore_handler_url: str, ui_vault: Path) -> None:
+        request = urllib.request.Request(
+            f"{restore_handler_url}/ui/restore",
+            data=f"source={'a' * 40}&path=note.md".encode(),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        with (
+            swap(ui, "git_restore_file", lambda *_a, **_k: ui_vault / "note.md"),
+            urllib.request.urlopen(request, timeout=10) as resp,
+        ):
+            assert resp.status == 200
+            assert "git commit" in resp.read().decode()
+
+
 # --- Snapshots endpoint ---
 
 
 class TestSnapshotsEndpoint:
-    def test_returns_table(self, ui_server: str) -> None:
-        snaps = [
-            ResticSnapshot(
-                id="a" * 64, short_id="abcdef12",
-                time="2025-01-15T10:30:00Z", paths=["/vault"], tags=["obsidian"],
-            ),
-        ]
-        with patch("vault_backup.ui.restic_snapshots", return_value=snaps):
-            status, body, _ = _get(f"{ui_server}/ui/snapshots")
+    def test_returns_table(
+        self, ui_server: HTTPConnection, sample_snapshot: ResticSnapshot
+    ) -> None:
+        snaps = [sample_snapshot]
+        with swap(ui, "restic_snapshots", lambda *_a, **_k: snaps):
+            status, body, _ = _get(ui_server, "/ui/snapshots")
         assert status == 200
         assert "abcdef12" in body
 
-    def test_empty(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.restic_snapshots", return_value=[]):
-            _, body, _ = _get(f"{ui_server}/ui/snapshots")
+    def test_empty(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "restic_snapshots", lambda *_a, **_k: []):
+            _, body, _ = _get(ui_server, "/ui/snapshots")
         assert "No snapshots found" in body
 
 
@@ -263,50 +252,50 @@ class TestSnapshotsEndpoint:
 
 
 class TestFilesEndpoint:
-    def test_returns_directory_listing(self, ui_server: str) -> None:
+    def test_returns_directory_listing(self, ui_server: HTTPConnection) -> None:
         entries = [
             ResticEntry(path="/vault", type="dir", size=0, mtime=""),
             ResticEntry(path="/vault/note.md", type="file", size=1024, mtime="2025-01-15T00:00:00Z"),
         ]
-        with patch("vault_backup.ui.restic_ls", return_value=entries):
-            status, body, _ = _get(f"{ui_server}/ui/files?snapshot=abcdef12")
+        with swap(ui, "restic_ls", lambda *_a, **_k: entries):
+            status, body, _ = _get(ui_server, "/ui/files?snapshot=abcdef12")
         assert status == 200
         assert "vault/" in body  # shows dir at root level
         assert "clickable" in body
 
-    def test_drills_into_directory(self, ui_server: str) -> None:
+    def test_drills_into_directory(self, ui_server: HTTPConnection) -> None:
         entries = [
             ResticEntry(path="/vault", type="dir", size=0, mtime=""),
             ResticEntry(path="/vault/note.md", type="file", size=1024, mtime="2025-01-15T00:00:00Z"),
         ]
-        with patch("vault_backup.ui.restic_ls", return_value=entries):
-            status, body, _ = _get(f"{ui_server}/ui/files?snapshot=abcdef12&path=/vault")
+        with swap(ui, "restic_ls", lambda *_a, **_k: entries):
+            status, body, _ = _get(ui_server, "/ui/files?snapshot=abcdef12&path=/vault")
         assert status == 200
         assert "note.md" in body
 
-    def test_missing_param(self, ui_server: str) -> None:
-        status, body, _ = _get(f"{ui_server}/ui/files")
+    def test_missing_param(self, ui_server: HTTPConnection) -> None:
+        status, body, _ = _get(ui_server, "/ui/files")
         assert status == 400
         assert "Missing" in body
 
-    def test_bad_snapshot(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.restic_ls", side_effect=ValueError("not found")):
-            status, body, _ = _get(f"{ui_server}/ui/files?snapshot=bad")
+    def test_bad_snapshot(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "restic_ls", raising(ValueError("not found"))):
+            status, body, _ = _get(ui_server, "/ui/files?snapshot=bad")
         assert status == 404
         assert "not found" in body
 
-    def test_empty(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.restic_ls", return_value=[]):
-            _, body, _ = _get(f"{ui_server}/ui/files?snapshot=abcdef12")
+    def test_empty(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "restic_ls", lambda *_a, **_k: []):
+            _, body, _ = _get(ui_server, "/ui/files?snapshot=abcdef12")
         assert "No files found" in body
 
-    def test_caches_restic_ls(self, ui_server: str) -> None:
+    def test_caches_restic_ls(self, ui_server: HTTPConnection) -> None:
         entries = [
             ResticEntry(path="/vault/note.md", type="file", size=100, mtime=""),
         ]
-        with patch("vault_backup.ui.restic_ls", return_value=entries) as mock_ls:
-            _get(f"{ui_server}/ui/files?snapshot=cached01")
-            _get(f"{ui_server}/ui/files?snapshot=cached01&path=/vault")
+        with swap(ui, "restic_ls", MagicMock(return_value=entries)) as mock_ls:
+            _get(ui_server, "/ui/files?snapshot=cached01")
+            _get(ui_server, "/ui/files?snapshot=cached01&path=/vault")
             assert mock_ls.call_count == 1  # only called once due to cache
 
 
@@ -314,28 +303,24 @@ class TestFilesEndpoint:
 
 
 class TestLogEndpoint:
-    def test_returns_commits(self, ui_server: str) -> None:
-        commits = [
-            GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="update notes"),
-        ]
-        with patch("vault_backup.ui.git_log", return_value=commits):
-            status, body, _ = _get(f"{ui_server}/ui/log")
+    def test_returns_commits(self, ui_server: HTTPConnection, sample_commit: GitCommit) -> None:
+        commits = [sample_commit]
+        with swap(ui, "git_log", lambda *_a, **_k: commits):
+            status, body, _ = _get(ui_server, "/ui/log")
         assert status == 200
         assert "abc123d" in body
         assert "update notes" in body
 
-    def test_with_file_filter(self, ui_server: str) -> None:
-        commits = [
-            GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="edit daily"),
-        ]
-        with patch("vault_backup.ui.git_file_history", return_value=commits) as mock_hist:
-            _, body, _ = _get(f"{ui_server}/ui/log?file=notes/daily.md")
+    def test_with_file_filter(self, ui_server: HTTPConnection, sample_commit: GitCommit) -> None:
+        commits = [sample_commit]
+        with swap(ui, "git_file_history", MagicMock(return_value=commits)) as mock_hist:
+            _, body, _ = _get(ui_server, "/ui/log?file=notes/daily.md")
             mock_hist.assert_called_once()
         assert "clickable" in body
 
-    def test_empty(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.git_log", return_value=[]):
-            _, body, _ = _get(f"{ui_server}/ui/log")
+    def test_empty(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "git_log", lambda *_a, **_k: []):
+            _, body, _ = _get(ui_server, "/ui/log")
         assert "No commits found" in body
 
 
@@ -343,31 +328,31 @@ class TestLogEndpoint:
 
 
 class TestPreviewEndpoint:
-    def test_git_preview(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.git_show_file", return_value="# Hello\n"):
-            status, body, _ = _get(f"{ui_server}/ui/preview?source={'a' * 40}&path=note.md")
+    def test_git_preview(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "git_show_file", lambda *_a, **_k: "# Hello\n"):
+            status, body, _ = _get(ui_server, f"/ui/preview?source={'a' * 40}&path=note.md")
         assert status == 200
         assert "# Hello" in body
         assert "Download" in body
 
-    def test_restic_preview(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.restic_show_file", return_value="restic content"):
-            status, body, _ = _get(f"{ui_server}/ui/preview?source=latest&path=/vault/note.md")
+    def test_restic_preview(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "restic_show_file", lambda *_a, **_k: "restic content"):
+            status, body, _ = _get(ui_server, "/ui/preview?source=latest&path=/vault/note.md")
         assert status == 200
         assert "restic content" in body
 
-    def test_ambiguous_tries_git_first(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.git_show_file", return_value="from git"):
-            _, body, _ = _get(f"{ui_server}/ui/preview?source=abcdef12&path=note.md")
+    def test_ambiguous_tries_git_first(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "git_show_file", lambda *_a, **_k: "from git"):
+            _, body, _ = _get(ui_server, "/ui/preview?source=abcdef12&path=note.md")
         assert "from git" in body
 
-    def test_missing_params(self, ui_server: str) -> None:
-        status, body, _ = _get(f"{ui_server}/ui/preview?source=abc")
+    def test_missing_params(self, ui_server: HTTPConnection) -> None:
+        status, body, _ = _get(ui_server, "/ui/preview?source=abc")
         assert status == 400
 
-    def test_not_found(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.git_show_file", side_effect=FileNotFoundError):
-            status, body, _ = _get(f"{ui_server}/ui/preview?source={'a' * 40}&path=gone.md")
+    def test_not_found(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "git_show_file", raising(FileNotFoundError)):
+            status, body, _ = _get(ui_server, f"/ui/preview?source={'a' * 40}&path=gone.md")
         assert status == 404
 
 
@@ -375,18 +360,18 @@ class TestPreviewEndpoint:
 
 
 class TestDownloadEndpoint:
-    def test_has_content_disposition(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.git_show_file", return_value="file content"):
+    def test_has_content_disposition(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "git_show_file", lambda *_a, **_k: "file content"):
             status, body, headers = _get(
-                f"{ui_server}/ui/download?source={'a' * 40}&path=notes/daily.md"
+                ui_server, f"/ui/download?source={'a' * 40}&path=notes/daily.md"
             )
         assert status == 200
         assert 'filename="daily.md"' in headers.get("Content-Disposition", "")
         assert body == "file content"
 
-    def test_not_found(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.git_show_file", side_effect=FileNotFoundError):
-            status, _, _ = _get(f"{ui_server}/ui/download?source={'a' * 40}&path=gone.md")
+    def test_not_found(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "git_show_file", raising(FileNotFoundError)):
+            status, _, _ = _get(ui_server, f"/ui/download?source={'a' * 40}&path=gone.md")
         assert status == 404
 
 
@@ -394,34 +379,37 @@ class TestDownloadEndpoint:
 
 
 class TestRestoreEndpoint:
-    def test_git_restore(self, ui_server: str, tmp_vault: Path) -> None:
-        target = tmp_vault / "note.md"
-        with patch("vault_backup.ui.git_restore_file", return_value=target):
+    def test_git_restore(self, ui_server: HTTPConnection, ui_vault: Path) -> None:
+        target = ui_vault / "note.md"
+        with swap(ui, "git_restore_file", lambda *_a, **_k: target):
             status, body = _post(
-                f"{ui_server}/ui/restore",
+                ui_server,
+                "/ui/restore",
                 f"source={'a' * 40}&path=note.md",
             )
         assert status == 200
         assert "git commit" in body
 
-    def test_restic_restore(self, ui_server: str, tmp_vault: Path) -> None:
-        restic_path = str(tmp_vault / "note.md")
-        with patch("vault_backup.ui.restic_restore_file", return_value=Path(restic_path)):
+    def test_restic_restore(self, ui_server: HTTPConnection, ui_vault: Path) -> None:
+        restic_path = str(ui_vault / "note.md")
+        with swap(ui, "restic_restore_file", lambda *_a, **_k: Path(restic_path)):
             status, body = _post(
-                f"{ui_server}/ui/restore",
+                ui_server,
+                "/ui/restore",
                 f"source=latest&path={restic_path}",
             )
         assert status == 200
         assert "restic snapshot" in body
 
-    def test_missing_params(self, ui_server: str) -> None:
-        status, body = _post(f"{ui_server}/ui/restore", "source=abc")
+    def test_missing_params(self, ui_server: HTTPConnection) -> None:
+        status, body = _post(ui_server, "/ui/restore", "source=abc")
         assert status == 400
 
-    def test_failure(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.git_restore_file", side_effect=FileNotFoundError("nope")):
+    def test_failure(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "git_restore_file", raising(FileNotFoundError("nope"))):
             status, body = _post(
-                f"{ui_server}/ui/restore",
+                ui_server,
+                "/ui/restore",
                 f"source={'a' * 40}&path=gone.md",
             )
         assert status == 404
@@ -432,37 +420,33 @@ class TestRestoreEndpoint:
 
 
 class TestRenderCommitFiles:
-    def test_shows_changed_files(self) -> None:
-        commit = GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="update notes")
+    def test_shows_changed_files(self, sample_commit: GitCommit) -> None:
         changes = [
             GitFileChange(path="notes/daily.md", status="M"),
             GitFileChange(path="notes/new.md", status="A"),
         ]
-        result = _render_commit_files(commit, changes)
+        result = _render_commit_files(sample_commit, changes)
         assert "abc123d" in result
         assert "notes/daily.md" in result
         assert "notes/new.md" in result
         assert "modified" in result
         assert "added" in result
 
-    def test_deleted_files_link_to_diff(self) -> None:
-        commit = GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="cleanup")
+    def test_deleted_files_link_to_diff(self, sample_commit: GitCommit) -> None:
         changes = [GitFileChange(path="old/removed.md", status="D")]
-        result = _render_commit_files(commit, changes)
+        result = _render_commit_files(sample_commit, changes)
         assert "deleted" in result
         assert "old/removed.md" in result
         assert "clickable" in result
         assert "/ui/diff?source=abc123d&path=old/removed.md" in result
 
-    def test_breadcrumb_links_to_log(self) -> None:
-        commit = GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="test")
-        result = _render_commit_files(commit, [])
+    def test_breadcrumb_links_to_log(self, sample_commit: GitCommit) -> None:
+        result = _render_commit_files(sample_commit, [])
         assert "/ui/log" in result
         assert "Git History" in result
 
-    def test_empty_changes(self) -> None:
-        commit = GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="empty")
-        result = _render_commit_files(commit, [])
+    def test_empty_changes(self, sample_commit: GitCommit) -> None:
+        result = _render_commit_files(sample_commit, [])
         assert "No files changed" in result
 
 
@@ -517,26 +501,27 @@ class TestRenderFilesDirectoryBrowsing:
 
 
 class TestCommitEndpoint:
-    def test_returns_changed_files(self, ui_server: str) -> None:
-        commit = GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="update")
+    def test_returns_changed_files(
+        self, ui_server: HTTPConnection, sample_commit: GitCommit
+    ) -> None:
         changes = [GitFileChange(path="notes/daily.md", status="M")]
         with (
-            patch("vault_backup.ui.git_log_single", return_value=[commit]),
-            patch("vault_backup.ui.git_diff_tree", return_value=changes),
+            swap(ui, "git_log_single", lambda *_a, **_k: [sample_commit]),
+            swap(ui, "git_diff_tree", lambda *_a, **_k: changes),
         ):
-            status, body, _ = _get(f"{ui_server}/ui/commit?hash=abc123d")
+            status, body, _ = _get(ui_server, "/ui/commit?hash=abc123d")
         assert status == 200
         assert "notes/daily.md" in body
         assert "modified" in body
 
-    def test_missing_hash(self, ui_server: str) -> None:
-        status, body, _ = _get(f"{ui_server}/ui/commit")
+    def test_missing_hash(self, ui_server: HTTPConnection) -> None:
+        status, body, _ = _get(ui_server, "/ui/commit")
         assert status == 400
         assert "Missing" in body
 
-    def test_commit_not_found(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.git_log_single", return_value=[]):
-            status, body, _ = _get(f"{ui_server}/ui/commit?hash=badbeef")
+    def test_commit_not_found(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "git_log_single", lambda *_a, **_k: []):
+            status, body, _ = _get(ui_server, "/ui/commit?hash=badbeef")
         assert status == 404
         assert "not found" in body
 
@@ -613,22 +598,22 @@ class TestPreviewDiffToggle:
 
 
 class TestDiffEndpoint:
-    def test_returns_diff(self, ui_server: str) -> None:
+    def test_returns_diff(self, ui_server: HTTPConnection) -> None:
         diff = "+added line\n-removed line\n"
-        with patch("vault_backup.ui.git_diff_file", return_value=diff):
-            status, body, _ = _get(f"{ui_server}/ui/diff?source={'a' * 40}&path=note.md")
+        with swap(ui, "git_diff_file", lambda *_a, **_k: diff):
+            status, body, _ = _get(ui_server, f"/ui/diff?source={'a' * 40}&path=note.md")
         assert status == 200
         assert 'class="diff-add"' in body
         assert 'class="diff-del"' in body
 
-    def test_missing_params(self, ui_server: str) -> None:
-        status, body, _ = _get(f"{ui_server}/ui/diff?source=abc")
+    def test_missing_params(self, ui_server: HTTPConnection) -> None:
+        status, body, _ = _get(ui_server, "/ui/diff?source=abc")
         assert status == 400
         assert "Missing" in body
 
-    def test_empty_diff(self, ui_server: str) -> None:
-        with patch("vault_backup.ui.git_diff_file", return_value=""):
-            status, body, _ = _get(f"{ui_server}/ui/diff?source={'a' * 40}&path=note.md")
+    def test_empty_diff(self, ui_server: HTTPConnection) -> None:
+        with swap(ui, "git_diff_file", lambda *_a, **_k: ""):
+            status, body, _ = _get(ui_server, f"/ui/diff?source={'a' * 40}&path=note.md")
         assert status == 200
         assert "No changes" in body
 
@@ -637,20 +622,17 @@ class TestDiffEndpoint:
 
 
 class TestStatusBadgeClasses:
-    def test_added_has_status_class(self) -> None:
-        commit = GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="add")
+    def test_added_has_status_class(self, sample_commit: GitCommit) -> None:
         changes = [GitFileChange(path="new.md", status="A")]
-        result = _render_commit_files(commit, changes)
+        result = _render_commit_files(sample_commit, changes)
         assert "status-added" in result
 
-    def test_modified_has_status_class(self) -> None:
-        commit = GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="edit")
+    def test_modified_has_status_class(self, sample_commit: GitCommit) -> None:
         changes = [GitFileChange(path="note.md", status="M")]
-        result = _render_commit_files(commit, changes)
+        result = _render_commit_files(sample_commit, changes)
         assert "status-modified" in result
 
-    def test_deleted_has_status_class(self) -> None:
-        commit = GitCommit(hash="a" * 40, short_hash="abc123d", date="2025-01-15T10:30:00+00:00", message="rm")
+    def test_deleted_has_status_class(self, sample_commit: GitCommit) -> None:
         changes = [GitFileChange(path="old.md", status="D")]
-        result = _render_commit_files(commit, changes)
+        result = _render_commit_files(sample_commit, changes)
         assert "status-deleted" in result